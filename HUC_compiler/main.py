@@ -4,68 +4,84 @@ This script uses the 'to_huc' attribute field from the NHD shapefile to identify
 basins to the target basin, then merges those basins together into a single shape and adds to an output shapefile
 """
 
-from ast import literal_eval
+import os
+from collections import defaultdict
 
 # import matplotlib as plt
 import geopandas as gpd
+import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
 from tqdm import tqdm
 
 HUC12_MT_shp = 'shapefiles/HUC12_MT.shp'
+N_JOBS = os.cpu_count() or 1  # worker processes used for the dissolve
 
-HUC12_gdf = gpd.read_file(HUC12_MT_shp)
+HUC12_gdf = gpd.read_file(HUC12_MT_shp, engine='pyogrio', use_arrow=True)
 
 huc_df = HUC12_gdf[['huc12', 'tohuc']]
 
-cont_huc_df = pd.DataFrame(columns=['basin_id', 'basin_list'])
-
 
 def basin_indexer():
-    """Function that outputs a .csv listing all contributing basins to a target HUC basin"""
-    for index, row in tqdm(huc_df.iterrows(), total=huc_df.shape[0], desc='Processing Rows'):
-        up_basins = []
-        all_basins = [row['huc12']]
-        tohuc_df = huc_df[huc_df['tohuc'] == row['huc12']]['huc12']
-        if tohuc_df.empty:
-            add_row = {'basin_id': row['huc12'], 'basin_list': all_basins}
-            cont_huc_df = pd.concat([cont_huc_df, pd.DataFrame([add_row])], ignore_index=True)
-        else:
-            up_basins.extend(tohuc_df.tolist())
-            all_basins.extend(tohuc_df.tolist())
-            i = 0
-            while i < len(up_basins):
-                tohuc_df = huc_df[huc_df['tohuc'] == up_basins[i]]['huc12']
-                i += 1
-                if not tohuc_df.empty:
-                    up_basins.extend(tohuc_df.tolist())
-                    all_basins.extend(tohuc_df.tolist())
-            add_row = {'basin_id': row['huc12'], 'basin_list': all_basins}
-            cont_huc_df = pd.concat([cont_huc_df, pd.DataFrame([add_row])], ignore_index=True)
-
-    cont_huc_df.to_csv('all_basins.csv')
+    """Function that outputs a .parquet listing all contributing basins to a target HUC basin"""
+    # Reverse adjacency: downstream huc -> list of hucs that drain directly into it
+    children = defaultdict(list)
+    for huc, tohuc in zip(huc_df['huc12'].values, huc_df['tohuc'].values):
+        children[tohuc].append(huc)
+
+    # Completed upstream lists, reused whenever a traversal reaches an already indexed basin
+    upstream = {}
+    rows = []
+    for huc in tqdm(huc_df['huc12'].values, total=huc_df.shape[0], desc='Processing Rows'):
+        all_basins = []
+        stack = [huc]
+        while stack:
+            x = stack.pop()
+            if x in upstream:
+                all_basins.extend(upstream[x])
+                continue
+            all_basins.append(x)
+            stack.extend(children.get(x, ()))
+        upstream[huc] = all_basins
+        rows.append({'basin_id': huc, 'basin_list': all_basins})
+
+    cont_huc_df = pd.DataFrame(rows, columns=['basin_id', 'basin_list'])
+    cont_huc_df.to_parquet('all_basins.parquet', index=False)
+    return cont_huc_df
+
+
+def _dissolve_partition(part_gdf):
+    """Dissolves a block of whole basins, every basin_id in the block is complete"""
+    return part_gdf.dissolve(by='basin_id', aggfunc='first')
 
 
 def basin_compiler(basins_df: pd.DataFrame):
     """Function that outputs a .shp of merged contributing basins to a target HUC basin"""
-    HUC12_comp_gdf = gpd.GeoDataFrame()
-    for index, row in tqdm(basins_df.iterrows(), total=huc_df.shape[0], desc='Processing Rows'):
-        ids_to_get = row['basin_list']
-        # This next bit ensures the row info preserved is the target basin (i.e. most downstream)
-        id_to_assign = str(row['basin_id'])
-        temp_gdf = HUC12_gdf[HUC12_gdf['huc12'].isin(ids_to_get)].copy()
-        temp_gdf['sort_key'] = temp_gdf['huc12'].apply(lambda x: 0 if x in id_to_assign else 1)
-        temp_gdf = temp_gdf.sort_values(by=['sort_key']).reset_index(drop=True)
+    # Long membership table: one row per (target basin, contributing huc12)
+    long_df = basins_df[['basin_id', 'basin_list']].explode('basin_list').rename(columns={'basin_list': 'huc12'})
+    long_df['basin_id'] = long_df['basin_id'].astype(str)
+    long_df['huc12'] = long_df['huc12'].astype(str)
+
+    merged_gdf = HUC12_gdf.merge(long_df, on='huc12', how='inner')
+
+    # This next bit ensures the row info preserved is the target basin (i.e. most downstream)
+    merged_gdf['sort_key'] = (merged_gdf['huc12'].values != merged_gdf['basin_id'].values).astype(np.int8)
+    merged_gdf = merged_gdf.sort_values(by=['basin_id', 'sort_key'])
 
-        temp_gdf = temp_gdf.dissolve(aggfunc='first')
-        # print(HUC12_comp_gdf)
-        # temp_gdf.plot()
-        # plt.show()
+    # Split into contiguous partitions on basin boundaries so no basin is spread across workers
+    basin_ids = merged_gdf['basin_id'].values
+    group_starts = np.r_[0, np.flatnonzero(basin_ids[1:] != basin_ids[:-1]) + 1]
+    part_starts = [chunk[0] for chunk in np.array_split(group_starts, N_JOBS) if len(chunk)]
+    edges = part_starts + [len(merged_gdf)]
+    parts = [merged_gdf.iloc[start:end] for start, end in zip(edges[:-1], edges[1:])]
 
-        HUC12_comp_gdf = pd.concat([HUC12_comp_gdf, temp_gdf], ignore_index=True)
-    HUC12_comp_gdf.to_file('shapefiles/HUC_12_comp.shp')
+    dissolved = Parallel(n_jobs=N_JOBS)(delayed(_dissolve_partition)(part) for part in parts)
+    HUC12_comp_gdf = pd.concat(dissolved)
+    HUC12_comp_gdf = HUC12_comp_gdf.reset_index(drop=True).drop(columns=['sort_key'])
+    HUC12_comp_gdf.to_file('shapefiles/HUC_12_comp.shp', engine='pyogrio', use_arrow=True)
+    return HUC12_comp_gdf
 
 
 # basin_indexer()
-basins_df = pd.read_csv('all_basins.csv')
-basins_df['basin_list'] = basins_df['basin_list'].apply(literal_eval)
+basins_df = pd.read_parquet('all_basins.parquet')
 basin_compiler(basins_df)
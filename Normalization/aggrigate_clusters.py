@@ -1,5 +1,10 @@
 import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
+from pyarrow import csv as pacsv
 import matplotlib.pyplot as plt
 import matplotlib.cm
 
@@ -24,39 +29,49 @@ Hex_Codes = {
 }
 
 
-def agg_timeseries(timeseries_csv, mapping, cluster_dfs):
+def read_timeseries(timeseries_csv):
     """
-    Aggregate a timeseries into the correct in-memory cluster DataFrame.
+    Read a single site timeseries as a Series indexed by doy/dowy.
     """
     gage_id = os.path.splitext(os.path.basename(timeseries_csv))[0]
-
-    # Lookup cluster assignment
-    row = mapping.loc[mapping["site_name"] == gage_id]
-    if row.empty:
-        print(f"⚠️ Gage ID {gage_id} not found in mapping.")
-        return cluster_dfs
-
-    cluster_num = int(row["cluster"].values[0])
-
-    # Load timeseries
-    ts = pd.read_csv(timeseries_csv)
+    ts = pacsv.read_csv(timeseries_csv).to_pandas()
 
     first_col = ts.columns[0].lower()
     if first_col not in ["doy", "dowy"]:
         raise ValueError(f"Unexpected first column {first_col} in {timeseries_csv}")
 
     # Store both the values and the type of index
-    ts = ts.set_index(first_col)
-    ts_values = ts.iloc[:, 0]
-    ts_values.name = gage_id
-    ts_values.index = ts_values.index.astype(int)
-    ts_values.index.name = first_col  # keep track of doy vs dowy
-
-    # Add to cluster dict
-    if cluster_num in cluster_dfs:
-        cluster_dfs[cluster_num][gage_id] = ts_values
-    else:
-        cluster_dfs[cluster_num] = ts_values.to_frame()
+    index = pd.Index(ts.iloc[:, 0].astype(int), name=first_col)  # keep track of doy vs dowy
+    # Coerce once here (only if pyarrow did not already parse numbers) so the per-cluster
+    # frames are already numeric float32
+    values = ts.iloc[:, 1]
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_numeric(values, errors="coerce")
+    return pd.Series(values.to_numpy(dtype=np.float32), index=index, name=gage_id)
+
+
+def agg_timeseries(timeseries_csvs, site_to_cluster):
+    """
+    Aggregate timeseries into one in-memory DataFrame per cluster.
+
+    site_to_cluster maps each site_name to its cluster number.
+    """
+    # Bucket files by cluster assignment
+    cluster_files = defaultdict(list)
+    for timeseries_csv in timeseries_csvs:
+        gage_id = os.path.splitext(os.path.basename(timeseries_csv))[0]
+        cluster_num = site_to_cluster.get(gage_id)
+        if cluster_num is None:
+            print(f"⚠️ Gage ID {gage_id} not found in mapping.")
+            continue
+        cluster_files[int(cluster_num)].append(timeseries_csv)
+
+    # pyarrow releases the GIL while parsing, so the reads overlap across threads
+    with ThreadPoolExecutor() as ex:
+        cluster_dfs = {
+            cluster_num: pd.concat(list(ex.map(read_timeseries, files)), axis=1)
+            for cluster_num, files in cluster_files.items()
+        }
 
     return cluster_dfs
 
@@ -64,8 +79,7 @@ def agg_timeseries(timeseries_csv, mapping, cluster_dfs):
 def mean_clusters(cluster_dfs):
     out = {}
     for cluster_num, df in cluster_dfs.items():
-        df = df.apply(pd.to_numeric, errors="coerce")
-        df["cluster_mean"] = df.mean(axis=1)
+        df["cluster_mean"] = np.nanmean(df.to_numpy(dtype=np.float32), axis=1)
         out[cluster_num] = df
         print(f"Cluster {cluster_num}: {df.shape[1]-1} sites")
     return out
@@ -73,16 +87,20 @@ def mean_clusters(cluster_dfs):
 
 def plot_cluster_means(cluster_dfs, plot_dates=True, monthly=False):
     import matplotlib.dates as mdates
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
 
-    plt.figure(figsize=(14, 7))
+    fig, ax = plt.subplots(figsize=(14, 7))
     colors = list(Hex_Codes.values())
     cmap = matplotlib.colormaps['Dark2']
 
+    segments, line_colors, handles = [], [], []
     for i, (cluster_num, df) in enumerate(sorted(cluster_dfs.items())):
-        df = df.apply(pd.to_numeric, errors="coerce")
-
-        # Detect if index is doy or dowy
-        index_name = df.index.name.lower() if df.index.name else "doy"
+        # Each cluster frame is an outer join of its own sites, so its doy/dowy support is taken
+        # per cluster and sorted so the line runs through the days in order
+        y_vals = df["cluster_mean"].sort_index()
+        day_index = y_vals.index
+        index_name = day_index.name.lower() if day_index.name else "doy"
 
         if plot_dates:
             if index_name == "dowy":
@@ -92,26 +110,28 @@ def plot_cluster_means(cluster_dfs, plot_dates=True, monthly=False):
                 # normal calendar year
                 start_date = pd.Timestamp("2000-01-01")
 
-            dt_index = pd.to_datetime(start_date + pd.to_timedelta(df.index - 1, unit="D"))
-            df.index = dt_index
+            x_index = pd.to_datetime(start_date + pd.to_timedelta(day_index - 1, unit="D"))
+        else:
+            x_index = day_index
 
         # Optionally aggregate monthly
         if monthly:
-            df = df.groupby(df.index.month).mean()
-            x_vals = pd.to_datetime("2000-" + df.index.astype(str) + "-15")
+            y_vals = y_vals.groupby(np.asarray(x_index.month)).mean()
+            x_vals = pd.to_datetime("2000-" + y_vals.index.astype(str) + "-15")
         else:
-            x_vals = df.index
+            x_vals = x_index
+        x_num = mdates.date2num(x_vals) if plot_dates else np.asarray(x_vals, dtype=float)
 
         color = colors[i % len(colors)] if i < len(colors) else cmap(i)
         num_sites = df.shape[1] - 1
 
-        plt.plot(
-            x_vals,
-            df["cluster_mean"],
-            label=f"Cluster {cluster_num}: {num_sites}",
-            color=color,
-            linewidth=2
-        )
+        segments.append(np.column_stack([x_num, y_vals.to_numpy()]))
+        line_colors.append(color)
+        handles.append(Line2D([], [], color=color, linewidth=2, label=f"Cluster {cluster_num}: {num_sites}"))
+
+    # One collection, one draw call for every cluster line
+    ax.add_collection(LineCollection(segments, colors=line_colors, linewidths=2))
+    ax.autoscale_view()
 
     if plot_dates:
         if monthly:
@@ -127,7 +147,7 @@ def plot_cluster_means(cluster_dfs, plot_dates=True, monthly=False):
 
     plt.ylabel("Discharge (cluster mean)")
     plt.title("Cluster Mean Hydrographs")
-    plt.legend()
+    plt.legend(handles=handles)
     plt.grid(True)
     plt.tight_layout()
     plt.show()
@@ -135,10 +155,10 @@ def plot_cluster_means(cluster_dfs, plot_dates=True, monthly=False):
 
 if __name__ == "__main__":
     mapping = pd.read_csv(CLUSTER_CSV)
-    cluster_dfs = {}
+    site_to_cluster = dict(zip(mapping["site_name"], mapping["cluster"]))
 
-    for file_name in os.listdir(DIRECTORY):
-        cluster_dfs = agg_timeseries(os.path.join(DIRECTORY, file_name), mapping, cluster_dfs)
+    all_files = [os.path.join(DIRECTORY, file_name) for file_name in os.listdir(DIRECTORY)]
+    cluster_dfs = agg_timeseries(all_files, site_to_cluster)
 
     cluster_dfs = mean_clusters(cluster_dfs)
 
@@ -1,4 +1,6 @@
 import os
+os.environ["OMP_NUM_THREADS"] = "1"  # avoid thread oversubscription across LOOP_MODE workers
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 
@@ -10,6 +12,25 @@ INPUT_FOLDER = 'timeseries'
 OUTPUT_FOLDER = 'ts_zscore_log_median'
 
 
+def centered_moving_average(values, window=7):
+    """
+    Centered moving average from cumulative sums, equivalent to
+    rolling(window, center=True, min_periods=1).mean(): the window shrinks
+    at the edges and NaN values are skipped.
+    """
+    valid = ~np.isnan(values)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    ccount = np.concatenate(([0], np.cumsum(valid)))
+
+    half = window // 2
+    idx = np.arange(len(values))
+    lo = np.maximum(idx - half, 0)
+    hi = np.minimum(idx + window - half, len(values))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (csum[hi] - csum[lo]) / (ccount[hi] - ccount[lo])
+
+
 def normalize(file_path, method, log=True, moving_average=False, annualize=False,
               annualize_method='median', water_year=True):
     """
@@ -84,14 +105,19 @@ def normalize(file_path, method, log=True, moving_average=False, annualize=False
 
     elif method == 'annual_flow_index':
         # Compute annual mean (calendar or water year)
+        year = ts_df.index.year.to_numpy()
         if water_year:
-            year_col = ts_df.index.year + (ts_df.index.month >= 10)
-        else:
-            year_col = ts_df.index.year
-        ts_df['year'] = year_col
-        annual_means = ts_df.groupby('year')['q'].transform('mean')
-        ts_df['q'] = ts_df['q'] / annual_means
-        ts_df.drop(columns=['year'], inplace=True)
+            year = year + (ts_df.index.month.to_numpy() >= 10)
+        _, inv = np.unique(year, return_inverse=True)
+
+        # Per-year sums/counts via bincount, skipping NaN flows like a pandas mean
+        q = ts_df['q'].to_numpy(dtype=float)
+        valid = ~np.isnan(q)
+        sums = np.bincount(inv, weights=np.where(valid, q, 0.0))
+        counts = np.bincount(inv, weights=valid)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            annual_means = sums / counts
+        ts_df['q'] = q / annual_means[inv]
         if log:
             ts_df['q'] = np.log1p(ts_df['q'])
     else:
@@ -103,9 +129,12 @@ def normalize(file_path, method, log=True, moving_average=False, annualize=False
         ts_df = ts_df[~((ts_df.index.month == 2) & (ts_df.index.day == 29))]
 
         if water_year:
-            ts_df["water_year"] = ts_df.index.year + (ts_df.index.month >= 10)
-            start = pd.to_datetime((ts_df["water_year"] - 1).astype(str) + "-10-01")
-            ts_df["dowy"] = (ts_df.index - start).dt.days + 1
+            # Days since Oct 1 of the water year: Jan-Sep are offset by the 92 days of Oct-Dec,
+            # Oct-Dec fall back by a full (leap-aware) calendar year
+            doy = ts_df.index.dayofyear.to_numpy()
+            is_oct_plus = ts_df.index.month.to_numpy() >= 10
+            year_len = 365 + ts_df.index.is_leap_year
+            ts_df["dowy"] = doy + 92 - is_oct_plus * year_len
             if annualize_method == 'median':
                 ts_df = ts_df.groupby("dowy")["q"].median()
             else:
@@ -120,13 +149,30 @@ def normalize(file_path, method, log=True, moving_average=False, annualize=False
     # --- Apply 7-day moving average if requested ---
     if moving_average:
         if isinstance(ts_df, pd.Series):
-            ts_df = ts_df.rolling(window=7, center=True, min_periods=1).mean()
+            ts_df = pd.Series(centered_moving_average(ts_df.to_numpy(dtype=float)),
+                              index=ts_df.index, name=ts_df.name)
         else:
-            ts_df['q'] = ts_df['q'].rolling(window=7, center=True, min_periods=1).mean()
+            ts_df['q'] = centered_moving_average(ts_df['q'].to_numpy(dtype=float))
 
     return ts_df
 
 
+def _one_file(file_name):
+    """Normalize a single file from INPUT_FOLDER and write it to OUTPUT_FOLDER (LOOP_MODE worker)."""
+    df_fill = normalize(
+        os.path.join(INPUT_FOLDER, file_name),
+        method='z_score',
+        log=True,
+        annualize=True,
+        annualize_method='median',
+        water_year=True,
+        moving_average=False
+    )
+    print(f"\n{file_name}")
+    if df_fill is not None:
+        df_fill.to_csv(os.path.join(OUTPUT_FOLDER, file_name))
+
+
 # --- Main loop ---
 if __name__ == '__main__':
     if LOOP_MODE:
@@ -136,19 +182,9 @@ if __name__ == '__main__':
             print(f"Created output folder: {OUTPUT_FOLDER}")
 
         all_files = os.listdir(INPUT_FOLDER)
-        for file_name in all_files:
-            df_fill = normalize(
-                os.path.join(INPUT_FOLDER, file_name),
-                method='z_score',
-                log=True,
-                annualize=True,
-                annualize_method='median',
-                water_year=True,
-                moving_average=False
-            )
-            print(f"\n{file_name}")
-            if df_fill is not None:
-                df_fill.to_csv(os.path.join(OUTPUT_FOLDER, file_name))
+        # Each file is independent, so spread them across all cores
+        with ProcessPoolExecutor() as ex:
+            list(ex.map(_one_file, all_files))
     else:
         df_fill = normalize(CSV_PATH, method="annual_flow_index",
                             annualize=True, water_year=True, log=True, moving_average=True)
@@ -2,7 +2,7 @@ import os
 os.environ["OMP_NUM_THREADS"] = "1"
 import pandas as pd
 from sklearn import cluster
-from sklearn.metrics import silhouette_score, davies_bouldin_score
+from sklearn.metrics import silhouette_score, davies_bouldin_score, pairwise_distances
 from sklearn.decomposition import PCA
 import matplotlib.pyplot as plt
 import numpy as np
@@ -40,13 +40,14 @@ class Clusterer:
 
         Returns
         -------
-        pd.Series
-            Cluster labels for each row in the DataFrame.
+        pd.DataFrame
+            The exclude_cols id columns (e.g. site_name) and the cluster label for each row, on the
+            input index; the feature columns are not copied.
         """
-        df = df.copy()
-
         if exclude_cols is None:
             exclude_cols = []
+        elif isinstance(exclude_cols, str):
+            exclude_cols = [exclude_cols]
 
         # Select only numeric columns, excluding any in exclude_cols
         numeric_cols = [col for col in df.select_dtypes(include=["number"]).columns if col not in exclude_cols]
@@ -74,9 +75,10 @@ class Clusterer:
 
         labels = self.model.fit_predict(X)
 
-        # Insert cluster as second column
-        df.insert(1, "cluster", labels)
-        return df
+        id_cols = [col for col in exclude_cols if col in df.columns]
+        out_df = df[id_cols].copy()
+        out_df["cluster"] = labels
+        return out_df
 
 
     def get_model(self):
@@ -136,6 +138,14 @@ def run_pca(df, exclude_cols=['site_name'], n_components=0.95):
 
 def gap_statistic(X, num_clusters, n_refs=10, random_state=42):
     np.random.seed(random_state)
+
+    # Reference datasets drawn once from the bounding box of X and shared by every k
+    X_refs = np.random.uniform(
+        np.min(X, axis=0),
+        np.max(X, axis=0),
+        size=(n_refs,) + X.shape
+    )
+
     gaps = []
     for k in num_clusters:
         # Fit to real data
@@ -143,15 +153,10 @@ def gap_statistic(X, num_clusters, n_refs=10, random_state=42):
         km.fit(X)
         Wk = km.inertia_
 
-        # Reference dispersions
+        # Reference dispersions, averaged in log space so MiniBatchKMeans is accurate enough
         ref_inertias = []
-        for _ in range(n_refs):
-            X_ref = np.random.uniform(
-                np.min(X, axis=0),
-                np.max(X, axis=0),
-                size=X.shape
-            )
-            km_ref = cluster.KMeans(n_clusters=k, random_state=random_state)
+        for X_ref in X_refs:
+            km_ref = cluster.MiniBatchKMeans(n_clusters=k, batch_size=1024, n_init=3, random_state=random_state)
             km_ref.fit(X_ref)
             ref_inertias.append(km_ref.inertia_)
 
@@ -173,6 +178,10 @@ if __name__ == "__main__":
     inertia = []
     sil_score = []
     dbi_score = []
+
+    # Pairwise distances between sites do not depend on the number of clusters
+    D = pairwise_distances(X, metric='euclidean')
+
     for num in num_clusters:
         clusterer = Clusterer(method=method, n_clusters=num)
 
@@ -182,7 +191,8 @@ if __name__ == "__main__":
         # Fit on PCA-transformed data
         c_df = clusterer.fit(pca_df)
 
-        c_df.to_csv(f'{num}_clusters.csv', index=False)
+        # Same file layout as before: site_name, cluster, then the features that were clustered
+        pd.concat([c_df, pca_df.drop(columns='site_name')], axis=1).to_csv(f'{num}_clusters.csv', index=False)
         model = clusterer.get_model()
 
         # Inertia only for KMeans
@@ -191,8 +201,8 @@ if __name__ == "__main__":
 
         # Compute silhouette score
         labels = c_df['cluster'].values
-        sil_score.append(silhouette_score(X, labels))
-        # Davies-Bouldin Index
+        sil_score.append(silhouette_score(D, labels, metric='precomputed'))
+        # Davies-Bouldin Index (centroid based, no pairwise matrix needed)
         dbi_score.append(davies_bouldin_score(X, labels))
 
     # Plot results
@@ -1,11 +1,11 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.cm
-import matplotlib.dates as mdates
+from pyarrow import csv as pacsv
+from numba import njit, prange
 from tslearn.clustering import TimeSeriesKMeans
-from tslearn.metrics import cdist_dtw
 from sklearn.metrics import silhouette_score, davies_bouldin_score, calinski_harabasz_score
 
 # ===========================
@@ -18,6 +18,10 @@ OUTPUT_FOLDER = "output"
 MIN_CLUSTERS = 2
 MAX_CLUSTERS = 12
 RANDOM_STATE = 42
+MAKE_PLOTS = True                 # False only writes the cluster CSVs and never imports matplotlib
+PLOT_DPI = 150
+CLUSTER_METHOD = "kmedoids"       # "kmedoids" (reuses the DTW matrix for every k) or "kmeans" (DBA barycenters)
+DTW_BAND_FRACTION = 0.05          # Sakoe-Chiba radius as a fraction of series length (min 5 days)
 
 Hex_Codes = {
     'green': '#117733', 'orange': '#D55E00', 'teal': '#44AA99', 'light blue': '#88CCEE',
@@ -26,90 +30,219 @@ Hex_Codes = {
 }
 
 
+# ===========================
+# DTW KERNELS
+# ===========================
+@njit(cache=True)
+def _banded_dtw(x, y, r):
+    """DTW distance (sqrt of the summed squared steps, as tslearn) within a Sakoe-Chiba band of radius r."""
+    n, m = x.shape[0], y.shape[0]
+    # Two rolling rows of the accumulated cost matrix instead of the full (n+1, m+1) matrix
+    prev = np.full(m + 1, np.inf)
+    curr = np.full(m + 1, np.inf)
+    prev[0] = 0.0
+    for i in range(1, n + 1):
+        curr[:] = np.inf
+        lo = max(1, i - r)
+        hi = min(m, i + r)
+        for j in range(lo, hi + 1):
+            d = x[i - 1] - y[j - 1]
+            curr[j] = d * d + min(prev[j - 1], prev[j], curr[j - 1])
+        prev, curr = curr, prev
+    return np.sqrt(prev[m])
+
+
+@njit(parallel=True, cache=True)
+def pairwise_dtw(X, r):
+    """Symmetric banded DTW distance matrix for the rows of X (n_series, L), pairs spread across cores."""
+    n = X.shape[0]
+    out = np.zeros((n, n))
+    for i in prange(n):
+        for j in range(i + 1, n):
+            d = _banded_dtw(X[i], X[j], r)
+            out[i, j] = d
+            out[j, i] = d
+    return out
+
+
+def kmedoids(D, k, n_init=2, max_iter=100, random_state=None):
+    """
+    Alternating k-medoids on a precomputed distance matrix D (n, n), seeded with k-medoids++.
+
+    Returns the labels of the restart with the lowest total distance to the assigned medoids.
+    """
+    rng = np.random.default_rng(random_state)
+    n = D.shape[0]
+    best_labels, best_cost = None, np.inf
+
+    for _ in range(n_init):
+        # k-medoids++: pick each new medoid with probability ~ squared distance to the nearest one
+        medoids = [rng.integers(n)]
+        nearest = D[medoids[0]].copy()
+        for _ in range(1, k):
+            weights = nearest ** 2
+            total = weights.sum()
+            medoid = rng.choice(n, p=weights / total) if total > 0 else rng.integers(n)
+            medoids.append(medoid)
+            nearest = np.minimum(nearest, D[medoid])
+        medoids = np.array(medoids)
+
+        for _ in range(max_iter):
+            labels = np.argmin(D[medoids], axis=0)
+            new_medoids = medoids.copy()
+            for c in range(k):
+                members = np.flatnonzero(labels == c)
+                if members.size:
+                    new_medoids[c] = members[np.argmin(D[np.ix_(members, members)].sum(axis=1))]
+            if np.array_equal(new_medoids, medoids):
+                break
+            medoids = new_medoids
+
+        labels = np.argmin(D[medoids], axis=0)
+        cost = D[medoids[labels], np.arange(n)].sum()
+        if cost < best_cost:
+            best_labels, best_cost = labels, cost
+
+    return best_labels
+
+
 # ===========================
 # CLUSTER AGGREGATION HELPERS
 # ===========================
-def agg_timeseries(timeseries_csv, mapping, cluster_dfs):
-    """Aggregate one timeseries into its correct cluster DataFrame."""
-    gage_id = os.path.splitext(os.path.basename(timeseries_csv))[0]
-    row = mapping.loc[mapping["site_name"] == gage_id]
-    if row.empty:
-        return cluster_dfs
+def read_values(timeseries_csv):
+    """Read the flow values (second column) of a timeseries CSV as a float32 array."""
+    return pacsv.read_csv(timeseries_csv).column(1).to_numpy().astype(np.float32)
+
 
-    cluster_num = int(row["cluster"].values[0])
-    ts = pd.read_csv(timeseries_csv)
+def read_timeseries(timeseries_csv):
+    """Read one timeseries as a long DataFrame with columns (doy/dowy, site, q)."""
+    gage_id = os.path.splitext(os.path.basename(timeseries_csv))[0]
+    ts = pacsv.read_csv(timeseries_csv).to_pandas()
     first_col = ts.columns[0].lower()
-    ts = ts.set_index(first_col)
-    ts_values = ts.iloc[:, 0]
-    ts_values.name = gage_id
-    ts_values.index = ts_values.index.astype(int)
-    ts_values.index.name = first_col
-
-    if cluster_num in cluster_dfs:
-        cluster_dfs[cluster_num][gage_id] = ts_values
-    else:
-        cluster_dfs[cluster_num] = ts_values.to_frame()
-    return cluster_dfs
+    values = ts.iloc[:, 1]
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_numeric(values, errors="coerce")
+    return pd.DataFrame({
+        first_col: ts.iloc[:, 0].astype(int).to_numpy(),
+        "site": gage_id,
+        "q": values.to_numpy(dtype=np.float32),
+    })
 
 
-def mean_clusters(cluster_dfs):
-    """Compute the mean timeseries for each cluster."""
-    out = {}
-    for cluster_num, df in cluster_dfs.items():
-        df = df.apply(pd.to_numeric, errors="coerce")
-        df["cluster_mean"] = df.mean(axis=1)
-        out[cluster_num] = df
-    return out
+def read_all_timeseries(timeseries_csvs):
+    """Read every timeseries once into a single long DataFrame, shared by all k."""
+    with ThreadPoolExecutor() as ex:
+        long_df = pd.concat(list(ex.map(read_timeseries, timeseries_csvs)), ignore_index=True)
+    long_df["site"] = long_df["site"].astype("category")
+    return long_df
 
 
-def plot_cluster_means(cluster_dfs, title, outfile):
-    """Plot mean hydrographs for each cluster."""
-    plt.figure(figsize=(14, 7))
-    colors = list(Hex_Codes.values())
-    cmap = matplotlib.colormaps['Dark2']
+def agg_timeseries(long_df, site_to_cluster):
+    """
+    Attach cluster assignments to the long timeseries frame.
 
+    Sites missing from site_to_cluster are dropped.
+    """
+    sites = long_df["site"].cat
+    # Map the (few) site categories, then broadcast to rows through the category codes
+    lookup = np.array([site_to_cluster.get(site, -1) for site in sites.categories], dtype=int)
+    cluster = lookup[sites.codes]
+    keep = cluster >= 0
+    return long_df[keep].assign(cluster=pd.Categorical(cluster[keep]))
 
-    for i, (cluster_num, df) in enumerate(sorted(cluster_dfs.items())):
-        df = df.apply(pd.to_numeric, errors="coerce")
-        index_name = df.index.name.lower() if df.index.name else "doy"
 
-        if index_name == "dowy":
-            # water year starts Oct 1 of prior year
-            start_date = pd.Timestamp("1999-10-01")
-        else:
-            # normal calendar year
-            start_date = pd.Timestamp("2000-01-01")
+def mean_clusters(long_df):
+    """
+    Compute the mean timeseries for each cluster.
+
+    Returns a wide DataFrame indexed by doy/dowy with one column per cluster,
+    and a Series with the number of sites in each cluster.
+    """
+    day_col = long_df.columns[0]
+    means = long_df.groupby(["cluster", day_col], observed=True)["q"].mean().unstack("cluster")
+    site_counts = long_df.groupby("cluster", observed=True)["site"].nunique()
+    return means, site_counts
+
+
+def _pyplot():
+    """Import pyplot on first use; plots are only saved, so default to the non-interactive Agg backend."""
+    import matplotlib
+    if "MPLBACKEND" not in os.environ:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
 
-        dt_index = pd.to_datetime(start_date + pd.to_timedelta(df.index - 1, unit="D"))
-        df.index = dt_index
-        x_vals = df.index
 
+def plot_cluster_means(means, site_counts, title, outfile):
+    """Plot mean hydrographs for each cluster."""
+    import matplotlib
+    import matplotlib.dates as mdates
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
+    plt = _pyplot()
+
+    fig, ax = plt.subplots(figsize=(14, 7))
+    colors = list(Hex_Codes.values())
+    cmap = matplotlib.colormaps['Dark2']
+
+    index_name = means.index.name.lower() if means.index.name else "doy"
+    if index_name == "dowy":
+        # water year starts Oct 1 of prior year
+        start_date = pd.Timestamp("1999-10-01")
+    else:
+        # normal calendar year
+        start_date = pd.Timestamp("2000-01-01")
+    # Matplotlib date numbers are days, so the day offsets map straight onto the axis
+    x_num = mdates.date2num(start_date) + (means.index.to_numpy() - 1)
+
+    segments, line_colors, handles = [], [], []
+    for i, cluster_num in enumerate(sorted(means.columns)):
         color = colors[i % len(colors)]  # use with custom hex codes
         # color = colors[i % len(colors)] if i < len(colors) else cmap(i)  # use with cmap
-        num_sites = df.shape[1] - 1
+        num_sites = site_counts[cluster_num]
 
-        plt.plot(
-            x_vals,
-            df["cluster_mean"],
-            label=f"Cluster {cluster_num}: {num_sites}",
-            color=color,
-            linewidth=2
-        )
+        segments.append(np.column_stack([x_num, means[cluster_num].to_numpy()]))
+        line_colors.append(color)
+        handles.append(Line2D([], [], color=color, linewidth=2, label=f"Cluster {cluster_num}: {num_sites}"))
 
-        plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%b'))
-        plt.gca().xaxis.set_major_locator(mdates.MonthLocator())
-        plt.xlabel("Month")
+    # One collection, one draw call for every cluster line
+    ax.add_collection(LineCollection(segments, colors=line_colors, linewidths=2))
+    ax.autoscale_view()
+
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b'))
+    ax.xaxis.set_major_locator(mdates.MonthLocator())
+    plt.xlabel("Month")
 
     plt.ylabel("Discharge (cluster mean)")
     plt.title(title)
-    plt.legend()
+    plt.legend(handles=handles)
     plt.grid(True)
     plt.tight_layout()
-    plt.savefig(outfile, dpi=300)
-    plt.close()
+    plt.savefig(outfile, dpi=PLOT_DPI, format="png")
+    plt.close(fig)
     print(f"Saved {outfile}")
 
 
+def plot_metrics(ks, sil_scores, dbi_scores, ch_scores, outfile):
+    """Plot the silhouette, Davies-Bouldin and Calinski-Harabasz scores against k."""
+    plt = _pyplot()
+    fig, axes = plt.subplots(1, 3, figsize=(15, 5))
+
+    axes[0].plot(ks, sil_scores, "ro-")
+    axes[0].set(title="Silhouette Score (↑ better)", xlabel="k", ylabel="Score")
+
+    axes[1].plot(ks, dbi_scores, "go-")
+    axes[1].set(title="Davies–Bouldin Index (↓ better)", xlabel="k", ylabel="Index")
+
+    axes[2].plot(ks, ch_scores, "bo-")
+    axes[2].set(title="Calinski–Harabasz Index (↑ better)", xlabel="k", ylabel="Score")
+
+    fig.tight_layout()
+    fig.savefig(outfile, dpi=PLOT_DPI, format="png")
+    plt.close(fig)
+    print(f"Saved metric plots to {outfile}")
+
+
 # ===========================
 # MAIN CLUSTERING FUNCTION
 # ===========================
@@ -120,35 +253,60 @@ def time_warp(input_folder, output_folder):
     """
     print(f"\n=== Processing {input_folder} ===")
 
-    time_series_list = []
-    file_names = []
-
-    for fname in os.listdir(input_folder):
-        if fname.endswith(".csv"):
-            df = pd.read_csv(os.path.join(input_folder, fname))
-            ts_values = df.values.flatten()
-            time_series_list.append(ts_values)
-            file_names.append(fname)
+    # One directory scan; DirEntry carries the type, so no extra stat per file
+    entries = [e for e in os.scandir(input_folder) if e.is_file() and e.name.endswith(".csv")]
+    file_names = [e.name for e in entries]
 
-    if not time_series_list:
+    if not file_names:
         print(f"No CSV files found in {input_folder}")
         return
 
-    X = np.array(time_series_list)[:, :, np.newaxis]
-    X_flat = X.reshape(X.shape[0], -1)
+    # Parse in a thread pool (pyarrow releases the GIL), size the dataset from the first file,
+    # then fill one preallocated (n, L, 1) block
+    paths = [e.path for e in entries]
+    site_names = [fname[:-len(".csv")] for fname in file_names]
+    with ThreadPoolExecutor() as ex:
+        series = ex.map(read_values, paths)
+        first = next(series)
+        X = np.empty((len(file_names), first.size, 1), dtype=np.float32)
+        X[0, :, 0] = first
+        for i, values in enumerate(series, start=1):
+            X[i, :, 0] = values
+
+    X_flat = X[:, :, 0]
+
+    # Long (doy/dowy, site, q) frame for the cluster mean plots, read once for every k
+    if MAKE_PLOTS:
+        all_ts = read_all_timeseries(paths)
 
     sil_scores, dbi_scores, ch_scores = [], [], []
 
     os.makedirs(output_folder, exist_ok=True)
 
+    # tslearn works in float64, cast once here instead of inside every fit
+    X_dtw = np.ascontiguousarray(X, dtype=np.float64)
+
+    # Banded DTW only fills O(L*r) cells of each cost matrix instead of O(L^2)
+    radius = max(5, int(X.shape[1] * DTW_BAND_FRACTION))
+    dtw_params = {"global_constraint": "sakoe_chiba", "sakoe_chiba_radius": radius}
+
+    # Pairwise DTW distances do not depend on k, compute once for every silhouette score.
+    # Silhouette averages the exact distance over every pair, so LB_Keogh pruning or
+    # early abandoning (which only bound a nearest-neighbour search) cannot be used here
+    dtw_dist = pairwise_dtw(X_dtw[:, :, 0], radius)
+
     for k in range(MIN_CLUSTERS, MAX_CLUSTERS + 1):
         print(f"\nClustering with k={k}...")
-        model = TimeSeriesKMeans(
-            n_clusters=k, metric="dtw", max_iter=10, n_init=2, random_state=RANDOM_STATE
-        )
-        labels = model.fit_predict(X)
+        if CLUSTER_METHOD == "kmedoids":
+            # Medoids only need pairwise distances, so every k reuses the one DTW matrix
+            labels = kmedoids(dtw_dist, k, n_init=2, random_state=RANDOM_STATE)
+        else:
+            model = TimeSeriesKMeans(
+                n_clusters=k, metric="dtw", metric_params=dtw_params, max_iter=10, n_init=2, init="k-means++",
+                n_jobs=-1, random_state=RANDOM_STATE
+            )
+            labels = model.fit_predict(X_dtw)
 
-        dtw_dist = cdist_dtw(X)
         sil = silhouette_score(dtw_dist, labels, metric="precomputed")
         dbi = davies_bouldin_score(X_flat, labels)
         ch = calinski_harabasz_score(X_flat, labels)
@@ -157,60 +315,37 @@ def time_warp(input_folder, output_folder):
         dbi_scores.append(dbi)
         ch_scores.append(ch)
 
-        site_names = [file.replace(".csv", "") for file in file_names]
         mapping_df = pd.DataFrame({"site_name": site_names, "cluster": labels})
         cluster_csv = os.path.join(output_folder, f"dtw_clusters_k{k}.csv")
         mapping_df.to_csv(cluster_csv, index=False)
         print(f"Saved cluster assignments to {cluster_csv}")
 
         # === Aggregated cluster plots ===
-        cluster_dfs = {}
-        for fname in os.listdir(input_folder):
-            if fname.endswith(".csv"):
-                cluster_dfs = agg_timeseries(os.path.join(input_folder, fname), mapping_df, cluster_dfs)
-        cluster_dfs = mean_clusters(cluster_dfs)
-
-        out_plot = os.path.join(output_folder, f"dtw_clusters_k{k}.png")
-        plot_cluster_means(
-            cluster_dfs,
-            title=f"Cluster Mean Hydrographs (k={k})",
-            outfile=out_plot,
-        )
+        if MAKE_PLOTS:
+            site_to_cluster = dict(zip(site_names, labels))
+            means, site_counts = mean_clusters(agg_timeseries(all_ts, site_to_cluster))
+
+            out_plot = os.path.join(output_folder, f"dtw_clusters_k{k}.png")
+            plot_cluster_means(
+                means,
+                site_counts,
+                title=f"Cluster Mean Hydrographs (k={k})",
+                outfile=out_plot,
+            )
 
     # === Summary metric plots ===
-    plt.figure(figsize=(15, 5))
-    ks = range(MIN_CLUSTERS, MAX_CLUSTERS + 1)
-
-    plt.subplot(1, 3, 1)
-    plt.plot(ks, sil_scores, "ro-")
-    plt.title("Silhouette Score (↑ better)")
-    plt.xlabel("k"); plt.ylabel("Score")
-
-    plt.subplot(1, 3, 2)
-    plt.plot(ks, dbi_scores, "go-")
-    plt.title("Davies–Bouldin Index (↓ better)")
-    plt.xlabel("k"); plt.ylabel("Index")
-
-    plt.subplot(1, 3, 3)
-    plt.plot(ks, ch_scores, "bo-")
-    plt.title("Calinski–Harabasz Index (↑ better)")
-    plt.xlabel("k"); plt.ylabel("Score")
-
-    plt.tight_layout()
-    metrics_plot = os.path.join(output_folder, "cluster_metrics.png")
-    plt.savefig(metrics_plot, dpi=300)
-    plt.close()
-    print(f"Saved metric plots to {metrics_plot}")
+    if MAKE_PLOTS:
+        ks = range(MIN_CLUSTERS, MAX_CLUSTERS + 1)
+        plot_metrics(ks, sil_scores, dbi_scores, ch_scores, os.path.join(output_folder, "cluster_metrics.png"))
 
 
 # ===========================
 # MAIN SCRIPT LOGIC
 # ===========================
 if LOOP_MODE:
-    for folder_name in os.listdir(DATA_FOLDER):
-        subfolder_path = os.path.join(DATA_FOLDER, folder_name)
-        if os.path.isdir(subfolder_path):
-            out_subfolder = os.path.join(OUTPUT_FOLDER, folder_name)
-            time_warp(subfolder_path, out_subfolder)
+    for entry in os.scandir(DATA_FOLDER):
+        if entry.is_dir():
+            out_subfolder = os.path.join(OUTPUT_FOLDER, entry.name)
+            time_warp(entry.path, out_subfolder)
 else:
     time_warp(DATA_FOLDER, OUTPUT_FOLDER)
@@ -2,24 +2,146 @@ import os.path
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+from pyarrow import csv as pacsv
 from scipy.stats import skew
 import warnings
+from joblib import Parallel, delayed
 
 
 import stats_timing
 # import computation functions from submodules
 from stats_monthly import compute_monthly_stats
-from stats_extremes import compute_extreme_stats
-from stats_pulses import compute_pulse_stats, compute_pulse_rate_stats
+from stats_extremes import compute_extreme_stats, window_extremes
+from stats_pulses import compute_pulse_stats, compute_pulse_and_rate_stats
 from stats_rates import compute_rise_fall_stats
 from stats_timing import compute_timing_stats
 from stats_variability import compute_variability_stats
 from stats_baseflow import compute_baseflow_index
 from stats_colwell import compute_colwell_stats
 from stats_frequency import compute_frequency_stats
-from stats_mag7 import compute_mag7
+from stats_mag7 import compute_mag7, compute_mag7_grouped
 
 
+def _cv(values):
+    """
+    Sample coefficient of variation (std with ddof=1 over mean) of per-year values from their
+    sum and sum of squares. Missing values (None/NaN) are skipped; fewer than two values or a
+    zero mean give NaN.
+    """
+    values = np.array(values, dtype=float)
+    values = values[~np.isnan(values)]
+    n = len(values)
+    if n < 2:
+        return np.nan
+    total = values.sum()
+    if total == 0:
+        return np.nan
+    mean = total / n
+    # Julian days are small integers, so both sums are exact and the single pass loses no precision
+    var = max(values @ values - total * mean, 0.0) / (n - 1)
+    return np.sqrt(var) / mean
+
+
+def _pulse_and_rate_stats(g, q, q_sorted):
+    """Pulse, pulse-rate and rise/fall stats sharing one diff array."""
+    diffs = np.diff(q)
+    stats = compute_pulse_and_rate_stats(g, q=q, q_sorted=q_sorted, diffs=diffs)
+    stats.update(compute_rise_fall_stats(g, q=q, diffs=diffs))
+    return stats
+
+
+def _water_year_stats(wy, g, q, months, doy, years):
+    """All per-year statistics for one water year; g is its slice of the data, q/months/doy/years its arrays."""
+    stats = {}
+    # One sort shared by the L-moments, pulse thresholds and 1-day extremes
+    q_sorted = np.sort(q)
+
+    # --- Magnificent Seven metrics ---
+    stats.update(compute_mag7(g, q=q, q_sorted=q_sorted))
+
+    # --- Monthly stats ---
+    stats.update(compute_monthly_stats(g, q=q, months=months))
+
+    # --- Extremes ---
+    stats.update(compute_extreme_stats(g, q=q, q_sorted=q_sorted))
+
+    # --- Pulses, pulse rise/fall rates and rise/fall rates ---
+    stats.update(_pulse_and_rate_stats(g, q, q_sorted))
+
+    # --- Timing ---
+    stats.update(compute_timing_stats(g, q=q, doy=doy))
+
+    # --- Variability ---
+    stats.update(compute_variability_stats(g, q=q, years=years))
+
+    # --- Baseflow ---
+    stats.update(compute_baseflow_index(g, q=q, min_7day=stats["min_7day"]))
+
+    # --- Colwell ---
+    stats.update(compute_colwell_stats(g, q=q, months=months, doy=doy, years=years))
+
+    # --- Frequency stats ---
+    stats.update(compute_frequency_stats(g, q=q, years=years))
+
+    stats["water_year"] = wy
+    return stats
+
+
+def _hiap_year_stats(wy, g, q, doy, thresholds):
+    """
+    Per-year HIAP metrics for one water year; g is its slice of the data, q/doy its arrays and
+    thresholds the full-record (25th, 50th, 75th) percentile pulse thresholds.
+    """
+    stats = {}
+    low_thresh, median_thresh, high_thresh = thresholds
+
+    # Mean and std of the recorded days, from the shared float64 flows
+    valid = q[~np.isnan(q)]
+    mean_annual = valid.mean() if valid.size else np.nan
+    std_annual = valid.std(ddof=1) if valid.size > 1 else np.nan
+
+    # Ma1: mean daily flow
+    stats["Ma1"] = mean_annual
+
+    # Ma3: CV per year (std/mean)
+    stats["Ma3"] = std_annual / mean_annual if mean_annual != 0 else np.nan
+
+    # Ml17: min 7-day moving average / mean annual flow
+    min_7day = window_extremes(q, 7, min_count=1)[0]
+    stats["Ml17"] = min_7day / mean_annual if mean_annual != 0 else np.nan
+
+    # Fl1: low pulse count (25th percentile of full record)
+    pulses = compute_pulse_stats(g, low_thresh=low_thresh, high_thresh=np.inf, q=q)
+    stats["Fl1"] = pulses["low_pulse_count"]
+
+    # Fh1: high pulse count (75th percentile of full record)
+    pulses = compute_pulse_stats(g, low_thresh=-np.inf, high_thresh=high_thresh, q=q)
+    stats["Fh1"] = pulses["high_pulse_count"]
+
+    # Fh5: flood frequency (median of full record)
+    pulses = compute_pulse_stats(g, low_thresh=-np.inf, high_thresh=median_thresh, q=q)
+    stats["Fh5"] = pulses["high_pulse_count"]
+
+    # Tl2: variability of Julian date of annual minima (per-year is NaN)
+    stats["Tl2"] = np.nan
+
+    # Th1: Julian date of annual maximum
+    timing_stats = compute_timing_stats(g, q=q, doy=doy)
+    stats["Th1"] = timing_stats.get("julian_max", np.nan)
+
+    # Dh2: maximum 3-day moving average
+    stats["Dh2"] = window_extremes(q, 3, min_count=1)[1]
+
+    # Ta2, Ta3, Phase (per-year NaN)
+    stats["Ta2"] = np.nan
+    stats["Ta3"] = np.nan
+    stats["Phase"] = np.nan
+
+    stats["water_year"] = wy
+    # julian_min only feeds the all_years Tl2, so it is returned alongside the row
+    return stats, timing_stats["julian_min"]
+
 
 class EflowStats:
     """
@@ -58,41 +180,60 @@ class EflowStats:
         self.start_month = start_month
         self.exclude_ranges = exclude_ranges or []
         self.df = self._load_data()
+        self._clean = None  # filled on first use by _clean_data
         warnings.simplefilter(action="ignore", category=FutureWarning)
 
     def _load_data(self):
-        df = pd.read_csv(self.infile)
+        # Read the header first so only the date and flow columns are parsed; q is float32 to halve
+        # the bytes every per-year aggregation moves. The body goes through pyarrow's multithreaded
+        # parser; dates stay text there, since Arrow would shift offset timestamps to UTC days
+        columns = pd.read_csv(self.infile, nrows=0).columns
+        date_col = "datetime" if "datetime" in columns else columns[0]
+        if "q" not in columns:
+            raise ValueError("CSV must contain a 'q' column.")
+        convert = pacsv.ConvertOptions(include_columns=[date_col, "q"],
+                                       column_types={date_col: pa.string(), "q": pa.float32()},
+                                       strings_can_be_null=True)
+        df = pacsv.read_csv(self.infile, convert_options=convert).to_pandas()
 
         # Normalize datetime
-        if "datetime" not in df.columns:
+        if date_col != "datetime":
             # Take the first column and make it the datetime column
-            first_col = df.columns[0]
-            df = df.rename(columns={first_col: "datetime"})
-
-        df["datetime"] = pd.to_datetime(df["datetime"], errors="coerce").dt.tz_localize(None)
+            df = df.rename(columns={date_col: "datetime"})
+
+        # ISO 8601 dates take pandas' vectorized parser; anything it cannot read (e.g. 10/1/1990)
+        # falls back to format inference for the whole column
+        raw = df["datetime"]
+        dates = pd.to_datetime(raw, format="ISO8601", errors="coerce", cache=True)
+        if dates.isna().sum() > raw.isna().sum():
+            dates = pd.to_datetime(raw, errors="coerce", cache=True)
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        df["datetime"] = dates
         df = df.dropna(subset=["datetime"])
 
-        # Rename flow column to "q"
-        if "q" not in df.columns:
-            raise ValueError("CSV must contain a 'q' column.")
-
-        # Normalize to daily resolution (drop h:m:s)
-        df["datetime"] = df["datetime"].dt.normalize()
+        # Normalize to daily resolution (drop h:m:s) by truncating to whole days
+        df["datetime"] = df["datetime"].to_numpy().astype("datetime64[D]").astype("datetime64[ns]")
         df = df.sort_values("datetime").reset_index(drop=True)
         print(f"\n{os.path.basename(self.infile)}")
         return df
 
     def _water_year(self, dates):
         """Compute water year index for a datetime series."""
-        return np.where(dates.dt.month >= self.start_month,
-                        dates.dt.year + 1, dates.dt.year)
+        # branchless: months on/after the start month belong to the next water year
+        return dates.dt.year.to_numpy() + (dates.dt.month.to_numpy() >= self.start_month)
 
     def _apply_exclusions(self, df):
         """Remove user-specified date ranges from dataframe."""
+        if not self.exclude_ranges:
+            return df
+        # Combine every range into one mask so the frame is filtered (copied) once
+        dates = df["datetime"].to_numpy()
+        keep = np.ones(len(df), dtype=bool)
         for (start, end) in self.exclude_ranges:
-            start, end = pd.to_datetime(start), pd.to_datetime(end)
-            df = df[~df["datetime"].between(start, end)]
-        return df
+            start, end = pd.to_datetime(start).to_datetime64(), pd.to_datetime(end).to_datetime64()
+            keep &= (dates < start) | (dates > end)
+        return df[keep]
 
     def _check_completeness(self, df):
         """
@@ -107,63 +248,118 @@ class EflowStats:
         df["q"] = df["q"].clip(lower=1e-6)
 
         df["water_year"] = self._water_year(df["datetime"])
-        kept_years = []
-        excluded = []
-
-        fixed_frames = []  # to collect repaired per-year data
-
-        for wy, g in df.groupby("water_year"):
-            start = pd.Timestamp(year=wy - 1, month=self.start_month, day=1)
-            end = pd.Timestamp(year=wy, month=self.start_month, day=1) - pd.Timedelta(days=1)
-
-            expected = pd.date_range(start, end, freq="D")
-            g = g.set_index("datetime").reindex(expected)  # align to expected range
-            g.index.name = "datetime"
-
-            missing = g.index[g["q"].isna()]
-            nan_q = g["q"].isna().sum()
-
-            if nan_q == 1:
-                # fill the single missing value from the previous day
-                g["q"] = g["q"].fillna(method="ffill")
-                kept_years.append(wy)
-                fixed_frames.append(g.reset_index().assign(water_year=wy))
-            elif nan_q > 1:
-                print(f"⚠ Excluding incomplete water year {wy}:")
-                self._print_missing_ranges(missing)
-                print(f"   Missing q values: {nan_q}")
-                excluded.append(wy)
-            else:
-                kept_years.append(wy)
-                fixed_frames.append(g.reset_index().assign(water_year=wy))
 
-        # Concatenate repaired kept years
-        if fixed_frames:
-            df = pd.concat(fixed_frames, ignore_index=True)
+        # --- One daily grid covering every observed water year ---
+        years = np.unique(df["water_year"].to_numpy())
+        starts = pd.to_datetime({"year": years - 1, "month": self.start_month, "day": 1}).to_numpy()
+        ends = pd.to_datetime({"year": years, "month": self.start_month, "day": 1}).to_numpy()
+        lengths = ((ends - starts) // np.timedelta64(1, "D")).astype(int)
+        bounds = np.concatenate(([0], np.cumsum(lengths)))  # year y is grid[bounds[y]:bounds[y + 1]]
+        grid_year = np.repeat(np.arange(len(years)), lengths)
+        offsets = np.arange(len(grid_year)) - np.repeat(bounds[:-1], lengths)
+        grid_dates = np.repeat(starts, lengths) + offsets.astype("timedelta64[D]")
+
+        # Place the observed flows on the grid; absent days stay NaN
+        grid_q = np.full(len(grid_dates), np.nan, dtype=df["q"].dtype)
+        grid_q[np.searchsorted(grid_dates, df["datetime"].to_numpy())] = df["q"].to_numpy()
+
+        missing_mask = np.isnan(grid_q)
+        nan_counts = np.bincount(grid_year, weights=missing_mask, minlength=len(years)).astype(int)
+
+        # fill a single missing value from the previous day (first day of a year has none)
+        fill = missing_mask & (nan_counts[grid_year] == 1) & (offsets > 0)
+        fill_idx = np.flatnonzero(fill)
+        grid_q[fill_idx] = grid_q[fill_idx - 1]
+
+        keep_year = nan_counts <= 1
+        kept_years = years[keep_year].tolist()
+        excluded = years[~keep_year].tolist()
+
+        for y in np.flatnonzero(~keep_year):
+            year_slice = slice(bounds[y], bounds[y + 1])
+            print(f"⚠ Excluding incomplete water year {years[y]}:")
+            self._print_missing_ranges(pd.DatetimeIndex(grid_dates[year_slice][missing_mask[year_slice]]))
+            print(f"   Missing q values: {nan_counts[y]}")
+
+        # Keep the complete (or repaired) years; known, ordered categories let every later
+        # groupby skip hashing and sorting the years
+        if kept_years:
+            keep_rows = keep_year[grid_year]
+            df = pd.DataFrame({
+                "datetime": grid_dates[keep_rows],
+                "q": grid_q[keep_rows],
+                "water_year": pd.Categorical(years[grid_year[keep_rows]], categories=kept_years, ordered=True),
+            })
         else:
-            df = pd.DataFrame(columns=df.columns)
+            df = pd.DataFrame({
+                "datetime": pd.Series(dtype="datetime64[ns]"),
+                "q": pd.Series(dtype=df["q"].dtype),
+                "water_year": pd.Categorical([]),
+            })
 
         return df, kept_years, excluded
 
+    def _clean_data(self):
+        """
+        Apply the exclusions and completeness check once per instance and cache the result.
+
+        Returns the cleaned frame, kept and excluded water years, and a dict of its columns as
+        NumPy arrays (float64 q, month, doy, calendar year, and each water year's start/end row)
+        so every stats method slices the same arrays instead of re-extracting them from the frame.
+        """
+        if self._clean is None:
+            df = self._apply_exclusions(self.df)
+            df, kept_years, excluded = self._check_completeness(df)
+            dates = df["datetime"]
+            water_years, starts = np.unique(df["water_year"].to_numpy(), return_index=True)
+            months_since_epoch = dates.to_numpy().astype("datetime64[M]").astype(np.int64)
+            arrays = {
+                "q": df["q"].to_numpy(dtype=float),
+                "month": (months_since_epoch % 12 + 1).astype(np.int8),
+                "doy": dates.dt.dayofyear.to_numpy(),
+                "year": dates.dt.year.to_numpy(),
+                "water_years": water_years,
+                "starts": starts,
+                "ends": np.append(starts[1:], len(df)),
+            }
+            for values in arrays.values():
+                values.flags.writeable = False  # shared by every stats call; guard against in-place edits
+            self._clean = (df, kept_years, excluded, arrays)
+        return self._clean
+
     def export_timeseries(self):
         """simply exports the cleaned timseries as a df for your convenience"""
-        df = self._apply_exclusions(self.df)
-        df, kept_years, excluded = self._check_completeness(df)
-        return df
+        df, kept_years, excluded, arrays = self._clean_data()
+        return df.copy()
 
 
     def _print_missing_ranges(self, missing_dates):
         """Pretty-print consecutive missing date ranges."""
-        s = pd.Series(missing_dates).sort_values()
-        groups = (s.diff().dt.days != 1).cumsum()
-        for _, block in s.groupby(groups):
-            start, end = block.min().date(), block.max().date()
+        days = np.sort(np.asarray(missing_dates, dtype="datetime64[D]"))
+        if not len(days):
+            return
+        # A new range starts wherever consecutive missing days are more than one day apart
+        breaks = np.flatnonzero(np.diff(days) != np.timedelta64(1, "D")) + 1
+        for block in np.split(days, breaks):
+            start, end = block[0], block[-1]
             if start == end:
                 print(f"   Missing date: {start}")
             else:
                 print(f"   Missing date range: {start} → {end}")
 
 
+    def _format_results(self, results):
+        """Build the output frame: water_year first, the 'all_years' row on top, then years ascending."""
+        if len(results) > 1:
+            results = results[:1] + sorted(results[1:], key=lambda row: row["water_year"])
+        # Columns in first-seen order, then the frame is built once from whole columns instead of
+        # letting pandas infer it row by row from the dicts
+        names = list(dict.fromkeys(name for row in results for name in row))
+        cols = ["water_year"] + [c for c in names if c != "water_year"]
+        df_out = pd.DataFrame({c: [row.get(c, np.nan) for row in results] for c in cols}, columns=cols)
+        # Stats taken straight from the float32 flows arrive as float32 scalars; report in float64
+        return df_out.astype({c: float for c in cols if df_out[c].dtype == np.float32})
+
     def magnificent_seven(self):
         """
         Compute the updated 'Magnificent Seven' hydrologic indicators.
@@ -182,31 +378,25 @@ class EflowStats:
             - 'water_year' : int or 'all_years'
             - Magnificent 7 flow statistics
         """
-        df = self._apply_exclusions(self.df)
-        df, kept_years, excluded = self._check_completeness(df)
+        df, kept_years, excluded, arrays = self._clean_data()
 
-        results = []
-        for wy, g in df.groupby("water_year"):
-            stats = compute_mag7(g)
-            stats["water_year"] = wy
-            results.append(stats)
+        # All water years in one vectorized pass
+        per_year = compute_mag7_grouped(df, by="water_year").reset_index()
+        results = per_year.to_dict("records")
 
         # --- Aggregate across all years ---
         if results:
-            all_stats = compute_mag7(df)
+            all_stats = compute_mag7(df, q=arrays["q"])
             all_stats["water_year"] = "all_years"
             results.insert(0, all_stats)
 
         # --- Format DataFrame ---
-        df_out = pd.DataFrame(results)
-        cols = ["water_year"] + [c for c in df_out.columns if c != "water_year"]
-        df_out = df_out[cols]
-        df_out.loc[1:] = df_out.loc[1:].sort_values("water_year")
+        df_out = self._format_results(results)
 
         return df_out
 
 
-    def HIAP_stats(self, use_median=False):
+    def HIAP_stats(self, use_median=False, n_jobs=-1):
         """
         Compute HIAP metrics (Henriksen et al., 2006) in a format consistent with all_stats/mag7 outputs.
 
@@ -214,139 +404,89 @@ class EflowStats:
         ----------
         use_median : bool
             Aggregate per-year metrics using median if True, otherwise mean.
+        n_jobs : int, optional
+            Number of threads used for the per-year metrics (default -1 = all cores, 1 = serial).
 
         Returns
         -------
         pandas.DataFrame
             One row per water year plus an aggregated 'all_years' row.
         """
-        df = self._apply_exclusions(self.df)
-        df, kept_years, excluded = self._check_completeness(df)
-
-        results = []
+        df, kept_years, excluded, arrays = self._clean_data()
+        q_all = arrays["q"]
+        doy_all = arrays["doy"]
+
+        # Pulse thresholds come from the full record; np.percentile selects all three order
+        # statistics with one partition instead of sorting
+        low_thresh, median_thresh, high_thresh = np.percentile(q_all, [25, 50, 75])
+        thresholds = (low_thresh, median_thresh, high_thresh)
+        # The Ta3 flood threshold skips NaN like Series.quantile did: a kept year can still hold
+        # one NaN (a missing first day is not filled), which must not blank out Ta3
+        flood_thresh = np.nanpercentile(q_all, 100 * (1 - 1 / 1.67))
 
         # --- Compute per-year metrics ---
-        for wy, g in df.groupby("water_year"):
-            stats = {}
-
-            # Ma1: mean daily flow
-            stats["Ma1"] = g["q"].mean()
-
-            # Ma3: CV per year (std/mean)
-            stats["Ma3"] = g["q"].std(ddof=1) / g["q"].mean() if g["q"].mean() != 0 else np.nan
-
-            # Ml17: min 7-day moving average / mean annual flow
-            min_7day = g["q"].rolling(7, min_periods=1).mean().min()
-            mean_annual = g["q"].mean()
-            stats["Ml17"] = min_7day / mean_annual if mean_annual != 0 else np.nan
-
-            # Fl1: low pulse count (25th percentile of full record)
-            low_thresh = np.percentile(df["q"], 25)
-            pulses = compute_pulse_stats(g, low_thresh=low_thresh, high_thresh=np.inf)
-            stats["Fl1"] = pulses["low_pulse_count"]
-
-            # Fh1: high pulse count (75th percentile of full record)
-            high_thresh = np.percentile(df["q"], 75)
-            pulses = compute_pulse_stats(g, low_thresh=-np.inf, high_thresh=high_thresh)
-            stats["Fh1"] = pulses["high_pulse_count"]
-
-            # Fh5: flood frequency (median of full record)
-            median_thresh = np.median(df["q"])
-            pulses = compute_pulse_stats(g, low_thresh=-np.inf, high_thresh=median_thresh)
-            stats["Fh5"] = pulses["high_pulse_count"]
-
-            # Tl2: variability of Julian date of annual minima (per-year is NaN)
-            stats["Tl2"] = np.nan
-
-            # Th1: Julian date of annual maximum
-            timing_stats = compute_timing_stats(g)
-            stats["Th1"] = timing_stats.get("julian_max", np.nan)
-
-            # Dh2: maximum 3-day moving average
-            stats["Dh2"] = g["q"].rolling(3, min_periods=1).mean().max()
-
-            # Ta2, Ta3, Phase (per-year NaN)
-            stats["Ta2"] = np.nan
-            stats["Ta3"] = np.nan
-            stats["Phase"] = np.nan
-
-            stats["water_year"] = wy
-            results.append(stats)
+        # Water years are contiguous runs of the sorted record (slices) and independent of each
+        # other, so they run on threads like all_stats
+        per_year = Parallel(n_jobs=n_jobs, prefer="threads")(
+            delayed(_hiap_year_stats)(wy, df.iloc[start:end], q_all[start:end], doy_all[start:end], thresholds)
+            for wy, start, end in zip(arrays["water_years"], arrays["starts"], arrays["ends"])
+        )
+        results = [stats for stats, _ in per_year]
+        julian_mins = [julian_min for _, julian_min in per_year]
 
         # --- Aggregate all-years metrics ---
-        df_all = df.copy()
         stats_all = {}
 
         # Ma1
-        stats_all["Ma1"] = df_all["q"].mean()
+        stats_all["Ma1"] = df["q"].mean()
 
-        # Ma3: mean/median of annual CVs
-        yearly_cvs = df_all.groupby("water_year")["q"].agg(
-            lambda x: x.std(ddof=1) / x.mean() if x.mean() != 0 else np.nan)
+        # Ma3: mean/median of annual CVs (already computed per year above)
+        yearly_cvs = pd.Series([s["Ma3"] for s in results], dtype=float)
         stats_all["Ma3"] = yearly_cvs.median() if use_median else yearly_cvs.mean()
 
         # Ml17
-        min7_over_mean = df_all.groupby("water_year").apply(
-            lambda x: x["q"].rolling(7, min_periods=1).mean().min() / x["q"].mean() if x["q"].mean() != 0 else np.nan
-        )
+        min7_over_mean = pd.Series([s["Ml17"] for s in results], dtype=float)
         stats_all["Ml17"] = min7_over_mean.median() if use_median else min7_over_mean.mean()
 
-        # Fl1, Fh1, Fh5
-        low_thresh = np.percentile(df_all["q"], 25)
-        high_thresh = np.percentile(df_all["q"], 75)
-        median_thresh = np.median(df_all["q"])
-
-        fl1_per_year = df_all.groupby("water_year").apply(
-            lambda x: compute_pulse_stats(x, low_thresh=low_thresh, high_thresh=np.inf)["low_pulse_count"]
-        )
-        fh1_per_year = df_all.groupby("water_year").apply(
-            lambda x: compute_pulse_stats(x, low_thresh=-np.inf, high_thresh=high_thresh)["high_pulse_count"]
-        )
-        fh5_per_year = df_all.groupby("water_year").apply(
-            lambda x: compute_pulse_stats(x, low_thresh=-np.inf, high_thresh=median_thresh)["high_pulse_count"]
-        )
+        # Fl1, Fh1, Fh5: the per-year counts above already use the full-record thresholds
+        fl1_per_year = pd.Series([s["Fl1"] for s in results], dtype=float)
+        fh1_per_year = pd.Series([s["Fh1"] for s in results], dtype=float)
+        fh5_per_year = pd.Series([s["Fh5"] for s in results], dtype=float)
 
         stats_all["Fl1"] = fl1_per_year.median() if use_median else fl1_per_year.mean()
         stats_all["Fh1"] = fh1_per_year.median() if use_median else fh1_per_year.mean()
         stats_all["Fh5"] = fh5_per_year.median() if use_median else fh5_per_year.mean()
 
         # Ta2: Colwell predictability
-        stats_all["Ta2"] = compute_colwell_stats(df_all).get("colwell_predictability", np.nan)
+        colwell = compute_colwell_stats(df, q=q_all, months=arrays["month"], doy=doy_all, years=arrays["year"])
+        stats_all["Ta2"] = colwell.get("colwell_predictability", np.nan)
 
-        # Ta3: seasonal predictability of flooding
-        flood_thresh = df_all["q"].quantile(1 - 1 / 1.67)
-        df_all["month_bin"] = ((df_all["datetime"].dt.month - 1) // 2) + 1
-        flood_matrix = df_all[df_all["q"] > flood_thresh].groupby("month_bin")["q"].count()
+        # Ta3: seasonal predictability of flooding (flood days per 2-month bin)
+        month_bin = ((arrays["month"] - 1) // 2) + 1
+        flood_matrix = np.bincount(month_bin[q_all > flood_thresh], minlength=7)
         stats_all["Ta3"] = flood_matrix.max() / flood_matrix.sum() if flood_matrix.sum() > 0 else np.nan
 
         # Tl2 & Th1 using CV of Julian min/max
-        timing_all = df_all.groupby("water_year").apply(compute_timing_stats)
-        julian_mins = timing_all.apply(lambda x: x["julian_min"])
-        julian_maxs = timing_all.apply(lambda x: x["julian_max"])
-
-        stats_all["Tl2"] = (julian_mins.std(ddof=1) / julian_mins.mean()) * 100 if julian_mins.mean() != 0 else np.nan
-        stats_all["Th1"] = (julian_maxs.std(ddof=1) / julian_maxs.mean()) * 100 if julian_maxs.mean() != 0 else np.nan
+        stats_all["Tl2"] = _cv(julian_mins) * 100
+        stats_all["Th1"] = _cv([s["Th1"] for s in results]) * 100
 
         # Phase from MAG7
-        stats_all["Phase"] = compute_mag7(df_all)["phase"]
+        stats_all["Phase"] = compute_mag7(df, q=q_all)["phase"]
 
         # Dh2
-        dh2_per_year = df_all.groupby("water_year").apply(lambda x: x["q"].rolling(3, min_periods=1).mean().max())
+        dh2_per_year = pd.Series([s["Dh2"] for s in results], dtype=float)
         stats_all["Dh2"] = dh2_per_year.median() if use_median else dh2_per_year.mean()
 
         stats_all["water_year"] = "all_years"
         results.insert(0, stats_all)
 
         # --- Format DataFrame ---
-        df_out = pd.DataFrame(results)
-        cols = ["water_year"] + [c for c in df_out.columns if c != "water_year"]
-        df_out = df_out[cols]
-        df_out.loc[1:] = df_out.loc[1:].sort_values("water_year")
+        df_out = self._format_results(results)
 
         return df_out
 
 
-    def all_stats(self):
+    def all_stats(self, n_jobs=-1):
         """
         Compute extended flow statistics for each water year and overall.
 
@@ -361,119 +501,73 @@ class EflowStats:
         - Variability (coefficient of variation, standard deviation)
         - Baseflow index
 
+        Parameters
+        ----------
+        n_jobs : int, optional
+            Number of threads used for the per-year statistics (default -1 = all cores).
+
         Returns
         -------
         pandas.DataFrame
             A DataFrame with one row per water year plus an aggregated "all_years" row.
             Columns include water_year and all computed hydrologic statistics.
         """
-        df = self._apply_exclusions(self.df)
-        df, kept_years, excluded = self._check_completeness(df)
-
-        results = []
-        for wy, g in df.groupby("water_year"):
-            stats = {}
-
-            # --- Magnificent Seven metrics ---
-            stats.update(compute_mag7(g))
-
-            # --- Monthly stats ---
-            stats.update(compute_monthly_stats(g))
-
-            # --- Extremes ---
-            stats.update(compute_extreme_stats(g))
-
-            # --- Pulses ---
-            pulse_stats = compute_pulse_stats(g)
-            stats.update(pulse_stats)
-
-            # --- Pulse rise/fall rates ---
-            pulse_rate_stats = compute_pulse_rate_stats(
-                g,
-                high_thresh=pulse_stats["high_thresh_used"],
-                low_thresh=pulse_stats["low_thresh_used"]
+        df, kept_years, excluded, arrays = self._clean_data()
+
+        # Each water year is a contiguous slice (view) of the shared arrays
+        q_all = arrays["q"]
+        months_all = arrays["month"]
+        doy_all = arrays["doy"]
+        cal_years_all = arrays["year"]
+        years, starts, ends = arrays["water_years"], arrays["starts"], arrays["ends"]
+
+        # Water years are independent; the compute_* work is mostly NumPy, so threads share the arrays
+        results = Parallel(n_jobs=n_jobs, prefer="threads")(
+            delayed(_water_year_stats)(
+                wy, df.iloc[start:end], q_all[start:end], months_all[start:end], doy_all[start:end],
+                cal_years_all[start:end]
             )
-            stats.update(pulse_rate_stats)
-
-            # --- Rise/Fall rates ---
-            rise_fall_stats = compute_rise_fall_stats(g)
-            stats.update(rise_fall_stats)
-
-            # --- Timing ---
-            stats.update(compute_timing_stats(g))
-
-            # --- Variability ---
-            stats.update(compute_variability_stats(g))
-
-            # --- Baseflow ---
-            stats.update(compute_baseflow_index(g))
-
-            # --- Colwell ---
-            stats.update(compute_colwell_stats(g))
-
-            # --- Frequency stats ---
-            stats.update(compute_frequency_stats(g))
-
-            stats["water_year"] = wy
-            results.append(stats)
+            for wy, start, end in zip(years, starts, ends)
+        )
 
         # --- Aggregate across all years ---
         if results:
-            df_all = df.copy()
+            # The compute_* functions only read the frame, so the full record is shared rather than copied
+            df_all = df
             stats_all = {}
+            q_all_sorted = np.sort(q_all)
 
             # --- Magnificent Seven metrics ---
-            stats_all.update(compute_mag7(df_all))
+            stats_all.update(compute_mag7(df_all, q=q_all, q_sorted=q_all_sorted))
 
             # --- Monthly stats ---
-            stats_all.update(compute_monthly_stats(df_all))
+            stats_all.update(compute_monthly_stats(df_all, q=q_all, months=months_all))
 
             # --- Extreme stats ---
-            stats_all.update(compute_extreme_stats(df_all))
+            stats_all.update(compute_extreme_stats(df_all, q=q_all, q_sorted=q_all_sorted))
 
-            # --- Pulse stats ---
-            pulse_stats_all = compute_pulse_stats(df_all)
-            stats_all.update(pulse_stats_all)
-
-            # --- Pulse rise/fall rates ---
-            pulse_rate_stats_all = compute_pulse_rate_stats(
-                df_all,
-                high_thresh=pulse_stats_all["high_thresh_used"],
-                low_thresh=pulse_stats_all["low_thresh_used"]
-            )
-            stats_all.update(pulse_rate_stats_all)
-
-            # --- Rise/Fall rates ---
-            rise_fall_stats_all = compute_rise_fall_stats(df_all)
-            stats_all.update(rise_fall_stats_all)
+            # --- Pulse stats, pulse rise/fall rates and rise/fall rates ---
+            stats_all.update(_pulse_and_rate_stats(df_all, q_all, q_all_sorted))
 
             # --- Timing stats ---
-            stats_all.update(compute_timing_stats(df_all))
+            stats_all.update(compute_timing_stats(df_all, q=q_all, doy=doy_all))
 
             # --- Variability stats ---
-            stats_all.update(compute_variability_stats(df_all))
+            stats_all.update(compute_variability_stats(df_all, q=q_all, years=cal_years_all))
 
             # --- Baseflow index ---
-            stats_all.update(compute_baseflow_index(df_all))
+            stats_all.update(compute_baseflow_index(df_all, q=q_all, min_7day=stats_all["min_7day"]))
 
             # --- Colwell stats ---
-            stats_all.update(compute_colwell_stats(df_all))
+            stats_all.update(compute_colwell_stats(df_all, q=q_all, months=months_all, doy=doy_all,
+                                                         years=cal_years_all))
 
             # --- Frequency stats ---
-            stats_all.update(compute_frequency_stats(df_all))
+            stats_all.update(compute_frequency_stats(df_all, q=q_all, years=cal_years_all))
 
             # --- Compute CV of Julian min/max across valid water years ---
-            julian_max_by_year = [s["julian_max"] for s in results if s.get("julian_max") is not None]
-            julian_min_by_year = [s["julian_min"] for s in results if s.get("julian_min") is not None]
-
-            stats_all["cv_julian_max"] = (
-                np.std(julian_max_by_year, ddof=1) / np.mean(julian_max_by_year)
-                if len(julian_max_by_year) > 1 else np.nan
-            )
-            stats_all["cv_julian_min"] = (
-                np.std(julian_min_by_year, ddof=1) / np.mean(julian_min_by_year)
-                if len(julian_min_by_year) > 1 else np.nan
-            )
+            stats_all["cv_julian_max"] = _cv([s.get("julian_max") for s in results])
+            stats_all["cv_julian_min"] = _cv([s.get("julian_min") for s in results])
 
             # --- Normalize count-type metrics per water year ---
             COUNT_METRICS = ["high_pulse_count", "low_pulse_count", "reversals"]
@@ -486,10 +580,7 @@ class EflowStats:
             results.insert(0, stats_all)
 
         # --- Format output ---
-        df_out = pd.DataFrame(results)
-        cols = ["water_year"] + [c for c in df_out.columns if c != "water_year"]
-        df_out = df_out[cols]
-        df_out.loc[1:] = df_out.loc[1:].sort_values("water_year")
+        df_out = self._format_results(results)
 
         return df_out
 
@@ -1,4 +1,5 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from eflowstats import EflowStats
 
@@ -7,14 +8,22 @@ INPUT_DIR = "input"
 OUTPUT_DIR = "cleaned_ts"
 
 
-for filename in os.listdir(INPUT_DIR):
-    if filename.lower().endswith(".csv"):
-        filepath = os.path.join(INPUT_DIR, filename)
-        site_name = os.path.splitext(filename)[0]
+def _one_file(filename):
+    """Clean a single CSV from INPUT_DIR and write it to OUTPUT_DIR (process-pool worker)."""
+    filepath = os.path.join(INPUT_DIR, filename)
+    site_name = os.path.splitext(filename)[0]
 
-        # Initialize EflowStats object for this CSV
-        ef_stats = EflowStats(filepath)
-        ts_df = ef_stats.export_timeseries()
+    # Initialize EflowStats object for this CSV
+    ef_stats = EflowStats(filepath)
+    ts_df = ef_stats.export_timeseries()
 
-        output_file = os.path.join(OUTPUT_DIR, f"{site_name}.csv")
-        ts_df.to_csv(output_file, index=False)
+    output_file = os.path.join(OUTPUT_DIR, f"{site_name}.csv")
+    ts_df.to_csv(output_file, index=False)
+
+
+if __name__ == "__main__":
+    csv_files = [filename for filename in os.listdir(INPUT_DIR) if filename.lower().endswith(".csv")]
+
+    # Each file is independent, so spread them across all cores; chunksize=1 since file sizes vary
+    with ProcessPoolExecutor() as ex:
+        list(ex.map(_one_file, csv_files, chunksize=1))
@@ -1,40 +1,55 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from eflowstats import EflowStats
 
 INPUT_DIR = "input"
 OUTPUT_DIR = "output"
 COMPILED_FILENAME = "compiled_all_sites.csv"
+WRITE_PER_SITE = True  # set False when only the compiled all_years file is needed
 
-# Create output folder if it doesn't exist
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-compiled_rows = []
+def _one_file(filename):
+    """Compute and save HIAP stats for a single CSV, returning its all_years row (process-pool worker)."""
+    filepath = os.path.join(INPUT_DIR, filename)
+    site_name = os.path.splitext(filename)[0]
 
-for filename in os.listdir(INPUT_DIR):
-    if filename.lower().endswith(".csv"):
-        filepath = os.path.join(INPUT_DIR, filename)
-        site_name = os.path.splitext(filename)[0]
+    # Initialize EflowStats object for this CSV
+    ef_stats = EflowStats(filepath)
 
-        # Initialize EflowStats object for this CSV
-        ef_stats = EflowStats(filepath)
+    # Compute HIAP stats using the cleaned internal dataframe; sites already run one per core,
+    # so the per-year loop stays serial here
+    stats_df = ef_stats.HIAP_stats(n_jobs=1)
 
-        # Compute HIAP stats using the cleaned internal dataframe
-        stats_df = ef_stats.HIAP_stats()
-
-        # Save full stats for this site
+    # Save full stats for this site
+    if WRITE_PER_SITE:
         output_file = os.path.join(OUTPUT_DIR, f"{site_name}_HIAP_stats.csv")
         stats_df.to_csv(output_file, index=False)
 
-        # Append the all_years row for compilation
-        all_years_row = stats_df[stats_df["water_year"] == "all_years"].copy()
-        all_years_row.insert(0, "site_name", site_name)
-        compiled_rows.append(all_years_row)
+    # Return the all_years row for compilation
+    all_years_row = stats_df[stats_df["water_year"] == "all_years"].copy()
+    all_years_row.insert(0, "site_name", site_name)
+    return all_years_row
+
+
+if __name__ == "__main__":
+    # Create output folder if it doesn't exist
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    csv_files = [filename for filename in os.listdir(INPUT_DIR) if filename.lower().endswith(".csv")]
+
+    # Each site is independent, so spread them across all cores; map keeps the compiled rows in
+    # listing order and chunksize=1 since record lengths vary
+    with ProcessPoolExecutor() as ex:
+        compiled_rows = list(ex.map(_one_file, csv_files, chunksize=1))
 
-# Concatenate all compiled rows into a single DataFrame
-if compiled_rows:
-    compiled_df = pd.concat(compiled_rows, ignore_index=True)
-    compiled_file_path = os.path.join(OUTPUT_DIR, COMPILED_FILENAME)
-    compiled_df.to_csv(compiled_file_path, index=False)
+    # Concatenate all compiled rows into a single DataFrame
+    if compiled_rows:
+        compiled_df = pd.concat(compiled_rows, ignore_index=True)
+        compiled_file_path = os.path.join(OUTPUT_DIR, COMPILED_FILENAME)
+        compiled_df.to_csv(compiled_file_path, index=False)
 
-print(f"\nAll HIAP stats processed. Individual CSVs saved in '{OUTPUT_DIR}' and compiled CSV saved as '{COMPILED_FILENAME}'.")
\ No newline at end of file
+    if WRITE_PER_SITE:
+        print(f"\nAll HIAP stats processed. Individual CSVs saved in '{OUTPUT_DIR}' and compiled CSV saved as '{COMPILED_FILENAME}'.")
+    else:
+        print(f"\nAll HIAP stats processed. Compiled CSV saved in '{OUTPUT_DIR}' as '{COMPILED_FILENAME}'.")
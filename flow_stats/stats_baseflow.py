@@ -1,7 +1,8 @@
 import numpy as np
+from stats_extremes import window_extremes
 
 
-def compute_baseflow_index(df):
+def compute_baseflow_index(df, q=None, min_7day=None):
     """
     Compute the Baseflow Index (BFI) as per EflowStats (R version):
     BFI = (minimum 7-day rolling average flow) / (mean flow)
@@ -10,17 +11,22 @@ def compute_baseflow_index(df):
     ----------
     df : pandas.DataFrame
         Must contain 'q' (daily mean flow) for a single water year or the full record.
+    q : np.ndarray, optional
+        Precomputed float flows for `df`; saves re-extracting df["q"] when called per water year.
+    min_7day : float, optional
+        Minimum 7-day rolling mean already computed by compute_extreme_stats for the same flows.
 
     Returns
     -------
     dict
         - bfi
     """
-    q = df["q"].astype(float)
-    mean_flow = q.mean()
-    # Compute 7-day rolling average, right-aligned to match R behavior
-    rolling7 = q.rolling(window=7, min_periods=7).mean()
-    min_7day_avg = rolling7.min()
-    bfi = min_7day_avg / mean_flow if mean_flow not in (0, np.nan) else np.nan
+    if q is None:
+        q = df["q"].to_numpy(dtype=float)
+    mean_flow = np.nanmean(q)  # skips NaN like Series.mean
+    if min_7day is None:
+        # Compute 7-day rolling average, right-aligned to match R behavior
+        min_7day = window_extremes(q, 7)[0]
+    bfi = min_7day / mean_flow if mean_flow not in (0, np.nan) else np.nan
 
     return {"bfi": bfi}
\ No newline at end of file
@@ -1,8 +1,13 @@
 import numpy as np
 import pandas as pd
 
+# 2-month TA3 bins like EflowStats, indexed by calendar month:
+# Oct-Nov -> 0, Dec-Jan -> 1, Feb-Mar -> 2, Apr-May -> 3, Jun-Jul -> 4, Aug-Sep -> 5
+_MONTH_TO_BIN = np.array([-1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 0, 0, 1], dtype=np.int8)
+
+
 def compute_colwell_stats(df: pd.DataFrame, datetime_col="datetime", flow_col="q",
-                          n_time_bins=365, n_flow_bins=11) -> dict:
+                          n_time_bins=365, n_flow_bins=11, q=None, months=None, doy=None, years=None) -> dict:
     """
     Compute Colwell's Constancy (TA1), Predictability (TA2), and Seasonal Predictability of Flooding (TA3)
     from daily flows. Automatically computes 1.67-year flood threshold for TA3.
@@ -19,6 +24,11 @@ def compute_colwell_stats(df: pd.DataFrame, datetime_col="datetime", flow_col="q
         Number of time bins (default 365 days, leap days removed).
     n_flow_bins : int
         Number of flow bins for Colwell matrix (default 11, log10 scaling).
+    q : np.ndarray, optional
+        Precomputed float flows for `df`; saves re-extracting df[flow_col] when called per water year.
+    months, doy, years : np.ndarray, optional
+        Precomputed calendar month, day of year and calendar year of each row of `df`; all three
+        are needed to skip the datetime accessors.
 
     Returns
     -------
@@ -29,22 +39,41 @@ def compute_colwell_stats(df: pd.DataFrame, datetime_col="datetime", flow_col="q
             "colwell_predictability": float
         }
     """
-    df = df.copy()
-    df[datetime_col] = pd.to_datetime(df[datetime_col])
+    if q is None:
+        q = df[flow_col].to_numpy(dtype=float)
+    if months is None or doy is None or years is None:
+        dates = pd.to_datetime(df[datetime_col])
+        months = dates.dt.month.to_numpy()
+        doy = dates.dt.dayofyear.to_numpy()
+        years = dates.dt.year.to_numpy()
 
-    # --- Remove Feb 29th for consistent day-of-year ---
-    df = df[~((df[datetime_col].dt.month == 2) & (df[datetime_col].dt.day == 29))]
-    df["day"] = df.groupby(df[datetime_col].dt.year).cumcount() + 1
+    # --- Remove Feb 29th for consistent day-of-year (day 60 is Feb 29 only in leap years) ---
+    keep = ~((months == 2) & (doy == 60))
+    q, months, years = q[keep], months[keep], years[keep]
+
+    # Day codes = running count within each calendar year (groupby().cumcount() in NumPy): rank in a
+    # stable sort by year minus the position where that year's run starts
+    order = np.argsort(years, kind="stable")
+    sorted_years = years[order]
+    starts = np.flatnonzero(np.r_[True, sorted_years[1:] != sorted_years[:-1]])
+    day_idx = np.empty(len(years), dtype=np.int64)
+    day_idx[order] = np.arange(len(years)) - np.repeat(starts, np.diff(np.r_[starts, len(years)]))
 
     # --- Compute flow bins (log-scaled like EflowStats) ---
-    mean_flow = df[flow_col].mean()
+    valid = q[~np.isnan(q)]
+    mean_flow = valid.mean() if valid.size else np.nan
     log_mean_flow = np.log10(mean_flow)
-    df["log_flow"] = np.log10(df[flow_col])
     break_pts = np.array([0.1] + list(np.arange(0.25, 2.26, 0.25))) * log_mean_flow
-    df["flow_bin"] = np.searchsorted(np.sort(break_pts), df["log_flow"], side="right")
+    # log10 is monotonic, so bin the raw flows against 10**breakpoints rather than taking log10 of
+    # every day; negative flows (NaN in log space) still land in the top bin with the missing days
+    flow_bin = np.searchsorted(10 ** np.sort(break_pts), np.where(q < 0, np.nan, q), side="right")
 
     # --- Colwell matrix ---
-    colwell_matrix = pd.crosstab(df["day"], df["flow_bin"]).to_numpy()
+    # day and flow_bin are already small integer codes, so count (day, bin) pairs with one bincount;
+    # all-zero rows/columns are harmless since they drop out of every entropy below
+    n_bins = int(flow_bin.max()) + 1 if len(flow_bin) else 1
+    n_days = int(day_idx.max()) + 1 if len(day_idx) else 1
+    colwell_matrix = np.bincount(day_idx * n_bins + flow_bin, minlength=n_days * n_bins).reshape(n_days, n_bins)
     Z = colwell_matrix.sum()
     if Z == 0:
         return {
@@ -53,19 +82,18 @@ def compute_colwell_stats(df: pd.DataFrame, datetime_col="datetime", flow_col="q
             "colwell_predictability": np.nan,
         }
 
-    # --- Row and column sums ---
-    XJ = colwell_matrix.sum(axis=1)
-    YI = colwell_matrix.sum(axis=0)
+    # --- Joint, row and column probabilities (all share the total Z) ---
+    P = colwell_matrix / Z
+    XJ = colwell_matrix.sum(axis=1) / Z
+    YI = colwell_matrix.sum(axis=0) / Z
 
-    # --- Entropies ---
-    def entropy(vals):
-        vals = vals[vals > 0]
-        probs = vals / vals.sum()
-        return -np.sum(probs * np.log10(probs))
+    # --- Entropies (empty cells contribute 0 to -sum(p log p)) ---
+    def entropy(probs):
+        return -np.sum(probs * np.log10(probs, where=probs > 0, out=np.zeros_like(probs)))
 
     HX = entropy(XJ)
     HY = entropy(YI)
-    HXY = entropy(colwell_matrix.flatten())
+    HXY = entropy(P)
     HxY = HXY - HX
 
     # --- Colwell metrics ---
@@ -75,26 +103,18 @@ def compute_colwell_stats(df: pd.DataFrame, datetime_col="datetime", flow_col="q
 
     # --- TA3: seasonal predictability of flooding ---
     # Compute 1.67-year flood threshold from annual maxima
-    annual_max = df.groupby(df[datetime_col].dt.year)[flow_col].max()
+    annual_max = pd.Series(q).groupby(years).max()
     if len(annual_max) > 0:
         flood_threshold = np.percentile(annual_max, 100 * (1 - 1/1.67))
     else:
         flood_threshold = np.nan
 
-    df["flood_day"] = df[flow_col] > flood_threshold
-    df["month"] = df[datetime_col].dt.month
-
-    # 2-month bins like EflowStats: Oct-Nov, Dec-Jan, Feb-Mar, ...
-    bins = [(10, 11), (12, 1), (2, 3), (4, 5), (6, 7), (8, 9)]
-    flood_counts = []
-    for b in bins:
-        if b[0] > b[1]:
-            mask = df["month"].isin([b[0], b[1]])
-        else:
-            mask = df["month"].isin(b)
-        flood_counts.append(df.loc[mask, "flood_day"].sum())
-    total_flood_days = sum(flood_counts)
-    ta3 = max(flood_counts) / total_flood_days if total_flood_days > 0 else np.nan
+    flood_day = q > flood_threshold
+
+    # Flood days per 2-month bin in one pass through the month -> bin lookup
+    flood_counts = np.bincount(_MONTH_TO_BIN[months[flood_day]], minlength=6)
+    total_flood_days = flood_counts.sum()
+    ta3 = flood_counts.max() / total_flood_days if total_flood_days > 0 else np.nan
 
     return {
         "colwell_constancy": colwell_constancy,
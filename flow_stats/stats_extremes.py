@@ -1,8 +1,12 @@
-import pandas as pd
 import numpy as np
 
+try:
+    import bottleneck as bn
+except ImportError:  # optional; moving_mean falls back to plain NumPy
+    bn = None
 
-def compute_extreme_stats(df):
+
+def compute_extreme_stats(df, q=None, q_sorted=None):
     """
     Compute annual extreme flow statistics (1-, 3-, 7-, 30-, 90-day minima and maxima).
 
@@ -11,6 +15,10 @@ def compute_extreme_stats(df):
     df : pandas.DataFrame
         Must contain columns ['datetime', 'q']
         Should represent a single water year (or full dataset for all_years).
+    q : np.ndarray, optional
+        Precomputed float flows for `df`; saves re-extracting df["q"] when called per water year.
+    q_sorted : np.ndarray, optional
+        `q` already sorted ascending; the 1-day extremes are then read from its ends.
 
     Returns
     -------
@@ -18,16 +26,55 @@ def compute_extreme_stats(df):
         Keys like min_1day, max_1day, min_3day, max_3day, ...
     """
     out = {}
-    q = df["q"].astype(float)
+    q = df["q"].to_numpy(dtype=float) if q is None else q
 
     # 1-day extremes are just daily min/max
-    out["min_1day"] = q.min()
-    out["max_1day"] = q.max()
+    if q_sorted is None:
+        valid = q[~np.isnan(q)]
+        out["min_1day"] = valid.min() if valid.size else np.nan
+        out["max_1day"] = valid.max() if valid.size else np.nan
+    else:
+        # NaN sorts last, so the valid flows are the first n_valid entries
+        n_valid = np.searchsorted(q_sorted, np.nan)
+        out["min_1day"] = q_sorted[0] if n_valid else np.nan
+        out["max_1day"] = q_sorted[n_valid - 1] if n_valid else np.nan
 
     # Multi-day rolling means
     for win in [3, 7, 30, 90]:
-        rolling = q.rolling(win, min_periods=win).mean()
-        out[f"min_{win}day"] = rolling.min()
-        out[f"max_{win}day"] = rolling.max()
+        out[f"min_{win}day"], out[f"max_{win}day"] = window_extremes(q, win)
 
     return out
+
+
+def moving_mean(q, w, min_count=None):
+    """
+    Trailing w-day moving mean of a float array, like rolling(w, min_periods=min_count).mean():
+    NaN values are skipped and windows with fewer than min_count (default w) valid values are NaN.
+    Uses bottleneck when it is installed.
+    """
+    n = len(q)
+    min_count = w if min_count is None else min_count
+    if n < min_count:
+        return np.full(n, np.nan)
+    # Windows cannot reach back past the first day, so a window longer than the series is the series
+    w = min(w, n)
+    if bn is not None:
+        return bn.move_mean(q, w, min_count=min_count)
+
+    # Without bottleneck: sum each window directly (a running cumsum loses precision on long
+    # records with small flows). Padding with NaN gives the short leading windows.
+    windows = np.lib.stride_tricks.sliding_window_view(np.concatenate((np.full(w - 1, np.nan), q)), w)
+    count = np.count_nonzero(~np.isnan(windows), axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.nansum(windows, axis=1) / count
+    out[count < min_count] = np.nan
+    return out
+
+
+def window_extremes(q, w, min_count=None):
+    """(min, max) of moving_mean(q, w, min_count), NaN when no window is valid."""
+    means = moving_mean(q, w, min_count)
+    means = means[~np.isnan(means)]
+    if not means.size:
+        return np.nan, np.nan
+    return means.min(), means.max()
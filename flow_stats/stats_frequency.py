@@ -1,7 +1,7 @@
 import numpy as np
 import pandas as pd
 
-def compute_frequency_stats(df: pd.DataFrame) -> dict:
+def compute_frequency_stats(df: pd.DataFrame, q=None, years=None) -> dict:
     """
     Compute frequency-based hydrologic metrics:
     - Fh5: Flood frequency (median-flow threshold)
@@ -12,6 +12,11 @@ def compute_frequency_stats(df: pd.DataFrame) -> dict:
     df : pandas.DataFrame
         Must contain columns ['datetime', 'q'].
         Index should be datetime-like or 'datetime' column should be datetime.
+    q : np.ndarray, optional
+        Precomputed float flows for `df`; saves re-extracting df["q"] when called per water year.
+    years : np.ndarray, optional
+        Precomputed calendar year of each row of `df`; used together with `q` to skip the
+        frame copy and datetime accessor.
 
     Returns
     -------
@@ -22,18 +27,18 @@ def compute_frequency_stats(df: pd.DataFrame) -> dict:
             "ta3": float
         }
     """
-    df = df.copy()
-    if not np.issubdtype(df["datetime"].dtype, np.datetime64):
-        df["datetime"] = pd.to_datetime(df["datetime"])
-    df["year"] = df["datetime"].dt.year
+    if q is None or years is None:
+        datetimes = df["datetime"]
+        if not np.issubdtype(datetimes.dtype, np.datetime64):
+            datetimes = pd.to_datetime(datetimes)
+        q = df["q"].to_numpy(dtype=float)
+        years = datetimes.dt.year.to_numpy()
 
     results = {}
 
     # --- Fh5: Flood frequency (events above median flow threshold) ---
-    median_thresh = df["q"].median()
-    events_per_year = (
-        df.groupby("year")["q"].apply(lambda x: (x > median_thresh).sum())
-    )
+    median_thresh = pd.Series(q).median()
+    events_per_year = pd.Series(q > median_thresh).groupby(years).sum()
 
     results["fh5_mean"] = events_per_year.mean()
     results["fh5_median"] = events_per_year.median()
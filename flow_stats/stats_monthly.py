@@ -2,25 +2,51 @@ import pandas as pd
 import numpy as np
 
 
-def compute_monthly_stats(df):
+def compute_monthly_stats(df, q=None, months=None):
     """
     Compute mean/median monthly flow for a given year's dataframe.
     Expects columns: ['datetime', 'q']
 
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Must contain columns ['datetime', 'q'].
+    q : np.ndarray, optional
+        Precomputed float flows for `df`; saves re-extracting df["q"] when called per water year.
+    months : np.ndarray, optional
+        Precomputed month of each row of `df`.
+
     Returns
     -------
     dict
         Keys like 'mean_month_01', 'median_month_01', ..., 'mean_month_12', 'median_month_12'
     """
-    df = df.copy()
-    df["month"] = df["datetime"].dt.month
-    monthly = df.groupby("month")["q"].agg(["mean", "median"])
+    if q is None:
+        q = df["q"].to_numpy()
+    if months is None:
+        months = df["datetime"].dt.month.to_numpy()
+
+    # Missing days do not count toward a month; sorting by (month, flow) puts each month's flows
+    # in one ascending run, so its median is read from the middle of that run
+    valid = ~np.isnan(q)
+    q, months = q[valid], months[valid]
+    order = np.lexsort((q, months))
+    q_sorted, m_sorted = q[order], months[order]
+    counts = np.bincount(m_sorted, minlength=13)[1:13]
+    sums = np.bincount(m_sorted, weights=q_sorted, minlength=13)[1:13]
+    starts = np.searchsorted(m_sorted, np.arange(1, 13))
+    has_days = counts > 0
+    lo = np.where(has_days, starts + (counts - 1) // 2, 0)
+    hi = np.where(has_days, starts + counts // 2, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    if q_sorted.size:
+        medians = np.where(has_days, (q_sorted[lo] + q_sorted[hi]) / 2, np.nan)
+    else:
+        medians = np.full(12, np.nan)
+
     out = {}
     for m in range(1, 13):
-        if m in monthly.index:
-            out[f"mean_month_{m:02d}"] = monthly.loc[m, "mean"]
-            out[f"median_month_{m:02d}"] = monthly.loc[m, "median"]
-        else:
-            out[f"mean_month_{m:02d}"] = np.nan
-            out[f"median_month_{m:02d}"] = np.nan
+        out[f"mean_month_{m:02d}"] = means[m - 1]
+        out[f"median_month_{m:02d}"] = medians[m - 1]
     return out
@@ -2,7 +2,8 @@ import numpy as np
 import pandas as pd
 
 
-def compute_pulse_stats(df, high_thresh=None, low_thresh=None):
+def compute_pulse_stats(df, high_thresh=None, low_thresh=None, q=None, q_sorted=None,
+                        high_mask=None, low_mask=None):
     """
     Compute pulse counts and durations for high and low flow events.
     Uses 75th and 25th percentiles of daily flows by default.
@@ -15,6 +16,13 @@ def compute_pulse_stats(df, high_thresh=None, low_thresh=None):
         High flow threshold. If None, defaults to the 75th percentile of flows.
     low_thresh : float, optional
         Low flow threshold. If None, defaults to the 25th percentile of flows.
+    q : np.ndarray, optional
+        Precomputed float flows for `df`; saves re-extracting df["q"] when called per water year.
+    q_sorted : np.ndarray, optional
+        `q` already sorted ascending; the default thresholds are then read off it instead of
+        running np.percentile.
+    high_mask, low_mask : np.ndarray, optional
+        Precomputed `q >= high_thresh` / `q <= low_thresh`, shared with compute_pulse_rate_stats.
 
     Returns
     -------
@@ -33,44 +41,31 @@ def compute_pulse_stats(df, high_thresh=None, low_thresh=None):
         - 'low_thresh_used' : float
             Threshold applied for low flow pulses.
     """
-    flows = df["q"].values
+    flows = df["q"].values if q is None else q
 
+    if q_sorted is None and high_thresh is None and low_thresh is None:
+        # One partition serves both default thresholds
+        high_thresh, low_thresh = np.percentile(flows, [75, 25])
     if high_thresh is None:
-        high_thresh = np.percentile(flows, 75)
+        high_thresh = np.percentile(flows, 75) if q_sorted is None else sorted_percentile(q_sorted, 75)
     if low_thresh is None:
-        low_thresh = np.percentile(flows, 25)
-
-    # Identify high and low events
-    high_events = (flows >= high_thresh).astype(int)
-    low_events = (flows <= low_thresh).astype(int)
-
-    # Count event durations
-    def event_durations(events):
-        durations, count = [], 0
-        for e in events:
-            if e == 1:
-                count += 1
-            elif count > 0:
-                durations.append(count)
-                count = 0
-        if count > 0:
-            durations.append(count)
-        return durations
-
-    high_durations = event_durations(high_events)
-    low_durations = event_durations(low_events)
+        low_thresh = np.percentile(flows, 25) if q_sorted is None else sorted_percentile(q_sorted, 25)
+
+    # Identify high and low events and their run lengths
+    high_durations = _run_lengths(flows >= high_thresh if high_mask is None else high_mask)
+    low_durations = _run_lengths(flows <= low_thresh if low_mask is None else low_mask)
 
     return {
         "high_pulse_count": len(high_durations),
-        "high_pulse_avg_dur": np.mean(high_durations) if high_durations else 0,
+        "high_pulse_avg_dur": high_durations.mean() if high_durations.size else 0,
         "low_pulse_count": len(low_durations),
-        "low_pulse_avg_dur": np.mean(low_durations) if low_durations else 0,
+        "low_pulse_avg_dur": low_durations.mean() if low_durations.size else 0,
         "high_thresh_used": high_thresh,
         "low_thresh_used": low_thresh,
     }
 
 
-def compute_pulse_rate_stats(df, high_thresh, low_thresh):
+def compute_pulse_rate_stats(df, high_thresh, low_thresh, q=None, diffs=None, high_mask=None, low_mask=None):
     """
     Compute average rise/fall rates within high and low flow pulses,
     using thresholds from compute_pulse_stats (default: 75th / 25th percentiles).
@@ -83,6 +78,12 @@ def compute_pulse_rate_stats(df, high_thresh, low_thresh):
         Threshold for defining high flow pulses (typically 75th percentile).
     low_thresh : float
         Threshold for defining low flow pulses (typically 25th percentile).
+    q : np.ndarray, optional
+        Precomputed float flows for `df`; saves re-extracting df["q"] when called per water year.
+    diffs : np.ndarray, optional
+        Precomputed np.diff(q), shared with compute_rise_fall_stats.
+    high_mask, low_mask : np.ndarray, optional
+        Precomputed `q >= high_thresh` / `q <= low_thresh`, shared with compute_pulse_stats.
 
     Returns
     -------
@@ -97,19 +98,23 @@ def compute_pulse_rate_stats(df, high_thresh, low_thresh):
         - 'low_pulse_fall_mean' : float or None
             Mean daily fall rate during low flow pulses.
     """
-    flows = df["q"].values
-    diffs = np.diff(flows)
-    diffs = np.insert(diffs, 0, 0)  # align length
+    flows = df["q"].values if q is None else q
+    if diffs is None:
+        diffs = np.diff(flows)
+    if high_mask is None:
+        high_mask = flows >= high_thresh
+    if low_mask is None:
+        low_mask = flows <= low_thresh
+    # diffs[i] is the change into day i + 1; the first day has no change and never counts
+    # as a rise or fall, so it is simply left out
 
     # --- High flow pulses ---
-    high_mask = flows >= high_thresh
-    high_diffs = diffs[high_mask]
+    high_diffs = diffs[high_mask[1:]]
     high_rises = high_diffs[high_diffs > 0]
     high_falls = high_diffs[high_diffs < 0]
 
     # --- Low flow pulses ---
-    low_mask = flows <= low_thresh
-    low_diffs = diffs[low_mask]
+    low_diffs = diffs[low_mask[1:]]
     low_rises = low_diffs[low_diffs > 0]
     low_falls = low_diffs[low_diffs < 0]
 
@@ -121,15 +126,61 @@ def compute_pulse_rate_stats(df, high_thresh, low_thresh):
     }
 
 
-def _event_durations(events):
-    """Helper to calculate consecutive event durations from a binary array."""
-    durations, count = [], 0
-    for e in events:
-        if e == 1:
-            count += 1
-        elif count > 0:
-            durations.append(count)
-            count = 0
-    if count > 0:
-        durations.append(count)
-    return durations
+def compute_pulse_and_rate_stats(df, q=None, q_sorted=None, diffs=None):
+    """
+    compute_pulse_stats and compute_pulse_rate_stats in one call with the default 75th / 25th
+    percentile thresholds: the thresholds, the two event masks and the daily differences are
+    built once and shared by the counts, durations and rise/fall rates.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        DataFrame containing at least the column 'q' (daily streamflow values).
+    q : np.ndarray, optional
+        Precomputed float flows for `df`.
+    q_sorted : np.ndarray, optional
+        `q` already sorted ascending; the thresholds are read off it.
+    diffs : np.ndarray, optional
+        Precomputed np.diff(q).
+
+    Returns
+    -------
+    dict
+        The keys of compute_pulse_stats followed by those of compute_pulse_rate_stats.
+    """
+    flows = df["q"].values if q is None else q
+    if q_sorted is None:
+        high_thresh, low_thresh = np.percentile(flows, [75, 25])
+    else:
+        high_thresh, low_thresh = sorted_percentile(q_sorted, 75), sorted_percentile(q_sorted, 25)
+    high_mask = flows >= high_thresh
+    low_mask = flows <= low_thresh
+
+    stats = compute_pulse_stats(df, high_thresh, low_thresh, q=flows, high_mask=high_mask, low_mask=low_mask)
+    stats.update(compute_pulse_rate_stats(df, high_thresh, low_thresh, q=flows, diffs=diffs,
+                                          high_mask=high_mask, low_mask=low_mask))
+    return stats
+
+
+def sorted_percentile(q_sorted, pct):
+    """
+    np.percentile (linear method) of an already ascending-sorted array, without another
+    partition pass. NaN sorts last, so any NaN gives NaN like np.percentile.
+    """
+    n = len(q_sorted)
+    if n == 0 or np.isnan(q_sorted[-1]):
+        return np.nan
+    pos = pct / 100 * (n - 1)
+    lo = int(pos)
+    hi = min(lo + 1, n - 1)
+    t = pos - lo
+    a, b = q_sorted[lo], q_sorted[hi]
+    # Same interpolation as numpy's _lerp, so results match bit for bit
+    diff = b - a
+    return b - diff * (1 - t) if t >= 0.5 else a + diff * t
+
+
+def _run_lengths(mask):
+    """Durations of the runs of consecutive True values in a boolean array."""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
@@ -2,7 +2,7 @@ import numpy as np
 import pandas as pd
 
 
-def compute_rise_fall_stats(df):
+def compute_rise_fall_stats(df, q=None, diffs=None):
     """
     Compute daily rise/fall rates and reversals for a flow series.
 
@@ -11,6 +11,10 @@ def compute_rise_fall_stats(df):
     df : pandas.DataFrame
         Must contain columns ['datetime', 'q']
         Should represent a single water year (or full dataset for all_years).
+    q : np.ndarray, optional
+        Precomputed float flows for `df`; saves re-extracting df["q"] when called per water year.
+    diffs : np.ndarray, optional
+        Precomputed np.diff(q), shared with compute_pulse_rate_stats.
 
     Returns
     -------
@@ -19,24 +23,26 @@ def compute_rise_fall_stats(df):
         - fall_rate
         - reversals
     """
-    flows = df["q"].astype(float).values
+    flows = df["q"].astype(float).values if q is None else q
 
     if len(flows) < 2:
         return {"rise_rate": np.nan, "fall_rate": np.nan, "reversals": np.nan}
 
     # Daily differences
-    diffs = np.diff(flows)
+    if diffs is None:
+        diffs = np.diff(flows)
 
-    # Rise = positive diffs
-    rises = diffs[diffs > 0]
-    falls = diffs[diffs < 0]
+    # Rise = positive diffs; both masks are reused for the reversal count
+    pos = diffs > 0
+    neg = diffs < 0
+    rises = diffs[pos]
+    falls = diffs[neg]
 
     rise_rate = np.mean(rises) if len(rises) else 0
     fall_rate = np.mean(falls) if len(falls) else 0
 
-    # Count reversals = sign changes in diffs
-    signs = np.sign(diffs)
-    reversals = np.sum(signs[1:] * signs[:-1] < 0)
+    # Count reversals = a rise next to a fall (flat or missing days break a reversal)
+    reversals = np.count_nonzero((pos[1:] & neg[:-1]) | (neg[1:] & pos[:-1]))
 
     return {
         "mean_rise_rate": rise_rate,
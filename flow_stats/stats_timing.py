@@ -2,7 +2,7 @@ import numpy as np
 import pandas as pd
 
 
-def compute_timing_stats(df, all_years=False):
+def compute_timing_stats(df, all_years=False, q=None, doy=None):
     """
     Compute seasonality/timing metrics for a flow series.
 
@@ -13,6 +13,10 @@ def compute_timing_stats(df, all_years=False):
         Should represent a single water year (or full dataset for all_years).
     all_years : bool
         If True, compute CV of Julian min/max across years.
+    q : np.ndarray, optional
+        Precomputed float flows for `df`; saves re-extracting df["q"] when called per water year.
+    doy : np.ndarray, optional
+        Precomputed day of year of each row of `df`.
 
     Returns
     -------
@@ -23,19 +27,21 @@ def compute_timing_stats(df, all_years=False):
         - cv_julian_max: Coefficient of variation of Julian max (only if all_years=True)
         - cv_julian_min: Coefficient of variation of Julian min (only if all_years=True)
     """
-    df = df.copy()
-    df["doy"] = df["datetime"].dt.dayofyear
+    if q is None:
+        q = df["q"].to_numpy()
+    if doy is None:
+        doy = df["datetime"].dt.dayofyear.to_numpy()
+    has_flow = not np.isnan(q).all()
 
     # Max flow DOY
-    idx_max = df["q"].idxmax()
-    doy_max = int(df.loc[idx_max, "doy"]) if not pd.isna(idx_max) else np.nan
+    doy_max = int(doy[np.nanargmax(q)]) if has_flow else np.nan
 
     # Min flow DOY
-    idx_min = df["q"].idxmin()
-    doy_min = int(df.loc[idx_min, "doy"]) if not pd.isna(idx_min) else np.nan
+    doy_min = int(doy[np.nanargmin(q)]) if has_flow else np.nan
 
-    # Center of Timing (flow-weighted mean DOY)
-    center_of_timing = np.average(df["doy"], weights=df["q"]) if df["q"].sum() > 0 else np.nan
+    # Center of Timing (flow-weighted mean DOY); any missing flow leaves the total NaN
+    total = q.sum()
+    center_of_timing = float(np.dot(doy, q) / total) if total > 0 else np.nan
 
     result = {
         "julian_max": doy_max,
@@ -44,13 +50,15 @@ def compute_timing_stats(df, all_years=False):
     }
 
     if all_years:
-        # Group by water year to get DOY of min/max per year
-        julian_maxs = df.groupby("water_year").apply(lambda x: x.loc[x["q"].idxmax(), "doy"])
-        julian_mins = df.groupby("water_year").apply(lambda x: x.loc[x["q"].idxmin(), "doy"])
+        # Group by water year to get DOY of min/max per year: idxmax/idxmin over a positional
+        # index give row positions directly, so one lookup into doy replaces a per-group apply
+        by_year = pd.Series(q).groupby(df["water_year"].to_numpy(), sort=False)
+        julian_maxs = doy[by_year.idxmax().to_numpy()]
+        julian_mins = doy[by_year.idxmin().to_numpy()]
 
         # CV = std / mean
-        result["cv_julian_max"] = julian_maxs.std(ddof=1) / julian_maxs.mean() if julian_maxs.mean() != 0 else np.nan
-        result["cv_julian_min"] = julian_mins.std(ddof=1) / julian_mins.mean() if julian_mins.mean() != 0 else np.nan
+        result["cv_julian_max"] = np.std(julian_maxs, ddof=1) / julian_maxs.mean() if julian_maxs.mean() != 0 else np.nan
+        result["cv_julian_min"] = np.std(julian_mins, ddof=1) / julian_mins.mean() if julian_mins.mean() != 0 else np.nan
 
     return result
 
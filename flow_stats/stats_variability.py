@@ -2,7 +2,7 @@ import pandas as pd
 import numpy as np
 
 
-def compute_variability_stats(df: pd.DataFrame) -> dict:
+def compute_variability_stats(df: pd.DataFrame, q=None, years=None) -> dict:
     """
     Variability statistics for daily streamflow.
 
@@ -11,6 +11,10 @@ def compute_variability_stats(df: pd.DataFrame) -> dict:
     df : pandas.DataFrame
         Must contain a 'q' column with daily streamflow values.
         Must also contain a 'datetime' column for annual aggregation.
+    q : np.ndarray, optional
+        Precomputed float flows for `df`; saves re-extracting df["q"] when called per water year.
+    years : np.ndarray, optional
+        Precomputed calendar year of each row of `df`, used for the annual means.
 
     Returns
     -------
@@ -27,20 +31,28 @@ def compute_variability_stats(df: pd.DataFrame) -> dict:
         raise ValueError("DataFrame must contain a 'datetime' column.")
 
     # Ensure numeric values only
-    values = pd.to_numeric(df["q"], errors="coerce")
+    values = pd.to_numeric(df["q"], errors="coerce").to_numpy(dtype=float) if q is None else q
 
-    mean_daily = np.nanmean(values)
-    std_daily = np.nanstd(values, ddof=1)
+    # Drop missing days once, then take plain mean/std of what is left
+    valid = values[~np.isnan(values)]
+    mean_daily = valid.mean()
+    std_daily = valid.std(ddof=1)
 
     # CV of daily values
     cv_daily = std_daily / mean_daily if mean_daily != 0 else np.nan
 
     # Interannual CV: std of annual means / mean of annual means
-    df_copy = df[["q", "datetime"]].copy()
-    df_copy["year"] = df_copy["datetime"].dt.year
-    annual_means = df_copy.groupby("year")["q"].mean().values
-    mean_annual = np.nanmean(annual_means)
-    cv_interannual = np.nanstd(annual_means, ddof=1) / mean_annual if mean_annual != 0 else np.nan
+    if years is None:
+        years = df["datetime"].dt.year.to_numpy()
+    # Years are small dense integers, so group by offset from the first year with bincount; years
+    # without any recorded flow have no mean and are left out
+    has_flow = ~np.isnan(values)
+    year_idx = years[has_flow] - years.min() if len(years) else years
+    sums = np.bincount(year_idx, weights=values[has_flow])
+    counts = np.bincount(year_idx)
+    annual_means = sums[counts > 0] / counts[counts > 0]
+    mean_annual = annual_means.mean()
+    cv_interannual = annual_means.std(ddof=1) / mean_annual if mean_annual != 0 else np.nan
 
     return {
         "std_daily": std_daily,
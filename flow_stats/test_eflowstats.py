@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from eflowstats import EflowStats
+
+
+def _write_record(path, drop=()):
+    """Four water years of smooth synthetic daily flows, minus the given dates."""
+    dates = pd.date_range("2000-10-01", "2004-09-30", freq="D")
+    q = 50 + 40 * np.sin(2 * np.pi * np.arange(len(dates)) / 365.25) + 5 * np.cos(np.arange(len(dates)))
+    df = pd.DataFrame({"datetime": dates, "q": q})
+    df = df[~df["datetime"].isin(pd.to_datetime(list(drop)))]
+    df.to_csv(path, index=False)
+
+
+def test_hiap_ta3_ignores_nan_in_kept_year(tmp_path):
+    # The first day of a water year is not filled, so WY2002 is kept with one NaN day
+    infile = tmp_path / "site.csv"
+    _write_record(infile, drop=["2001-10-01"])
+    stats = EflowStats(str(infile))
+
+    df, kept_years, _, arrays = stats._clean_data()
+    assert 2002 in kept_years
+    assert np.isnan(arrays["q"]).sum() == 1
+
+    # Reference: flood threshold from Series.quantile (NaN-skipping), flood days per 2-month bin
+    flood_thresh = df["q"].quantile(1 - 1 / 1.67)
+    month_bin = (df["datetime"].dt.month - 1) // 2
+    flood_counts = month_bin[df["q"] > flood_thresh].value_counts()
+    expected = flood_counts.max() / flood_counts.sum()
+
+    all_years = stats.HIAP_stats(n_jobs=1).iloc[0]
+    assert all_years["water_year"] == "all_years"
+    assert np.isfinite(all_years["Ta3"])
+    assert np.isclose(all_years["Ta3"], expected)
@@ -1,10 +1,12 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
-import matplotlib.pyplot as plt
 import pandas as pd
 
 from LinAR_functions import interpolate_linar
 
+COMPRESS = False  # write .csv.zst
 LOOP_MODE = True
 
 INPUT_FOLDER = 'ts_data'
@@ -27,7 +29,10 @@ def linar_interpolate(file_path):
     number_of_diffs = 2  # NUMBER OF DIFFERENCINGS ALLOWED IN THE WHILE LOOP. DEFAULT = 2.
     output_file = os.path.join(OUTPUT_FOLDER, filepath)  # INSERT YOUR OUTPUT FILE NAME
 
-    df = pd.read_csv(filepath, index_col=0, parse_dates=True)
+    if filepath.endswith('.parquet'):  # FMT='parquet' output of fill_dates
+        df = pd.read_parquet(filepath)
+    else:
+        df = pd.read_csv(filepath, index_col=0, parse_dates=True)
     itpd = interpolate_linar(df, column_id, learn_len, max_lags, max_linear, max_linar, sig_adf, sig_ft,
                              number_of_diffs)
 
@@ -40,14 +45,21 @@ def linar_interpolate(file_path):
     return itpd
 
 
+def _one_file(file_name):
+    """Interpolate a single file from INPUT_FOLDER into OUTPUT_FOLDER (process-pool worker)."""
+    df_intr = linar_interpolate(os.path.join(INPUT_FOLDER, file_name))
+    print(f"\n{file_name}")
+    out_name = Path(file_name.removesuffix('.zst')).stem + ('.csv.zst' if COMPRESS else '.csv')
+    df_intr.to_csv(os.path.join(OUTPUT_FOLDER, out_name))
+
+
 if __name__ == '__main__':
 
     if LOOP_MODE:
         all_files = os.listdir(INPUT_FOLDER)
-        for file_name in all_files:
-            df_intr = linar_interpolate(os.path.join(INPUT_FOLDER, file_name))
-            print(f"\n{file_name}")
-            df_intr.to_csv(os.path.join(OUTPUT_FOLDER, file_name))
+        # Each file's AR fits are independent, so spread the files across all cores
+        with ProcessPoolExecutor() as ex:
+            list(ex.map(_one_file, all_files, chunksize=1))
 
     else:
         df_intr = linar_interpolate(CSV_PATH)
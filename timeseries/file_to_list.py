@@ -5,11 +5,13 @@ import pandas as pd
 folder_path = r'C:\Users\CND367\Documents\Python_Scripts\Basin_Project\timeseries\timeseries_interpolated'
 
 # get only .csv files, strip extension, and remove 'interpolated_' prefix if present
-files = [
-    os.path.splitext(f)[0].replace('interpolated_', '')
-    for f in os.listdir(folder_path)
-    if f.lower().endswith('.csv')
-]
+# (scandir entries carry their type, so subfolders are skipped without extra stat calls)
+with os.scandir(folder_path) as entries:
+    files = [
+        os.path.splitext(entry.name)[0].replace('interpolated_', '')
+        for entry in entries
+        if entry.is_file() and entry.name.lower().endswith('.csv')
+    ]
 
 # create dataframe
 df = pd.DataFrame(files, columns=['gage'])
@@ -1,10 +1,18 @@
 """Module that takes daily timeseries data and fills any missing date gaps, fills columns with np.nan"""
 
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 import pandas as pd
 
+from gap_tracker import report_gaps, track_gaps
+
 LOOP_MODE = False
+TRACK_GAPS = False  # True also reports each file's data gaps from the filled frame (no second read)
+FMT = 'csv'  # 'parquet' writes binary intermediates: the DatetimeIndex and float dtypes come back as stored and
+            # gap_tracker, lin_interpolate, LinAR, mice_forest and miss_forest read any .parquet input directly
+COMPRESS = False  # write .csv.zst
 
 CSV_PATH = 'timeseries_raw/06169500.csv'
 CSV_OUTPUT = 'timeseries_continuous/06169500.csv'
@@ -23,8 +31,8 @@ def gap_fill_dates(file_path):
     min_date = df.index.min()
     max_date = df.index.max()
 
-    # Generate a complete daily date range
-    full_date_range = pd.date_range(start=min_date, end=max_date, freq='D')
+    # Generate a complete daily date range (shared by every file of the batch with the same period)
+    full_date_range = _full_range(min_date.value, max_date.value, str(min_date.tz) if min_date.tz else None)
 
     # This will add missing dates and fill corresponding 'Value' with NaN
     df_filled = df.reindex(full_date_range)
@@ -32,16 +40,47 @@ def gap_fill_dates(file_path):
     return df_filled
 
 
+@lru_cache(maxsize=256)
+def _full_range(start_ns, end_ns, tz=None):
+    """Daily DatetimeIndex from start to end, keyed on int64 nanoseconds (+ tz name) so it can be cached."""
+    return pd.date_range(start=pd.Timestamp(start_ns, tz=tz), end=pd.Timestamp(end_ns, tz=tz), freq='D')
+
+
+def _filled_gaps(df_filled):
+    """Gap list of a frame from gap_fill_dates; every day is a row, so gaps are the NaN runs of its first column."""
+    return track_gaps(df_filled.index, df_filled.iloc[:, 0] if df_filled.shape[1] else None)
+
+
+def _write(df_filled, output_path):
+    """Write a filled frame as CSV (.csv.zst when COMPRESS), or as Parquet when FMT = 'parquet'."""
+    if FMT == 'parquet':
+        df_filled.to_parquet(os.path.splitext(output_path)[0] + '.parquet')
+    elif COMPRESS:
+        df_filled.to_csv(os.path.splitext(output_path)[0] + '.csv.zst')
+    else:
+        df_filled.to_csv(output_path)
+
+
+def _one_file(file_name):
+    """Fill the date gaps of a single file from INPUT_FOLDER into OUTPUT_FOLDER (process-pool worker)."""
+    df_fill = gap_fill_dates(os.path.join(INPUT_FOLDER, file_name))
+    print(f"\n{file_name}")
+    _write(df_fill, os.path.join(OUTPUT_FOLDER, file_name))
+    if TRACK_GAPS:
+        report_gaps(_filled_gaps(df_fill))
+
+
 if __name__ == '__main__':
 
     if LOOP_MODE:
         all_files = os.listdir(INPUT_FOLDER)
-        for file_name in all_files:
-            df_fill = gap_fill_dates(os.path.join(INPUT_FOLDER, file_name))
-            print(f"\n{file_name}")
-            df_fill.to_csv(os.path.join(OUTPUT_FOLDER, file_name))
+        # Files are independent, so spread them across all cores
+        with ProcessPoolExecutor() as ex:
+            list(ex.map(_one_file, all_files, chunksize=1))
 
     else:
         df_fill = gap_fill_dates(CSV_PATH)
         print(f"\n{CSV_PATH}")
-        df_fill.to_csv(CSV_OUTPUT)
+        _write(df_fill, CSV_OUTPUT)
+        if TRACK_GAPS:
+            report_gaps(_filled_gaps(df_fill))
@@ -6,13 +6,11 @@ new_gages_df = pd.read_csv('new_gages.csv')
 # print(new_gages_df)
 
 
-old_list = old_gages_df['gages'].tolist()
-# print(old_list)
+old_set = set(old_gages_df['gages'])  # hashed, so each membership test is O(1)
+# print(old_set)
 new_list = new_gages_df['gages'].tolist()
 # print(new_list)
 
-repeats = []
-for item in new_list:
-    if item in old_list:
-        repeats.append(item)
+# keep new_list order (and any repeats within it)
+repeats = [item for item in new_list if item in old_set]
 print(repeats)
\ No newline at end of file
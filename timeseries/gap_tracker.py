@@ -10,10 +10,9 @@ Config settings:
 import os
 import warnings
 
+import numpy as np
 import pandas as pd
 
-warnings.simplefilter(action='ignore', category=FutureWarning)
-
 LOOP_MODE = False
 SITE_FILE = '06169500.csv'
 OUTPUT_PATH = 'timeseries_continuous'
@@ -39,104 +38,95 @@ def gap_track(path, file, min_gap_duration_days=GAP_DAYS):
               is not suitable.
     """
     file_path = os.path.join(path, file)
-    df = pd.read_csv(file_path)
-
-    # 1. Ensure the DataFrame has a proper DatetimeIndex
-    if not isinstance(df.index, pd.DatetimeIndex):
-        # print("Warning: DataFrame index is not DatetimeIndex. Attempting to convert first column to index.")
-        if df.empty:
-            print("Error: DataFrame is empty, cannot process for gaps.")
-            return []
-        try:
-            # Create a copy to avoid modifying the original DataFrame directly
-            df_processed = df.copy()
-            # Attempt to convert the first column to datetime and set as index
-            df_processed.iloc[:, 0] = pd.to_datetime(df_processed.iloc[:, 0])
-            # pandas yells at me because I don't specify object types, future warning
-            df_processed = df_processed.set_index(df_processed.columns[0])
-            df = df_processed  # Use the processed DataFrame
-        except Exception as e:
-            print(
-                f"Error: Could not convert a column to DatetimeIndex. "
-                f"Please ensure your DataFrame has a datetime index or a suitable date column: {e}")
-            return []
+    if file_path.endswith('.parquet'):
+        df = pd.read_parquet(file_path).reset_index()  # fill_dates' Parquet output; dates back as column 0
+    else:
+        df = pd.read_csv(file_path)
 
+    # 1. Parse the first column as the dates
     if df.empty:
+        print("Error: DataFrame is empty, cannot process for gaps.")
+        return []
+    try:
+        dates = pd.to_datetime(df.iloc[:, 0])
+    except Exception as e:
+        print(
+            f"Error: Could not convert a column to DatetimeIndex. "
+            f"Please ensure your DataFrame has a datetime index or a suitable date column: {e}")
+        return []
+
+    return track_gaps(dates, df.iloc[:, 1] if df.shape[1] > 1 else None, min_gap_duration_days)
+
+
+def track_gaps(dates, values=None, min_gap_duration_days=GAP_DAYS):
+    """
+    Gap list for already-parsed dates, shared by gap_track and fill_dates (which reports the gaps of
+    the frame it just filled instead of re-reading it).
+
+    Args:
+        dates (array-like of datetimes): The date of each row.
+        values (array-like, optional): A data column; rows where it is NaN count as missing.
+        min_gap_duration_days (int): The minimum duration in days for a gap to be considered significant.
+
+    Returns:
+        list: The same gap dictionaries as gap_track.
+    """
+    # 2. Work in whole day numbers: a day counts as recorded if it has a row and, when there are data
+    # columns, the first data column is not NaN there
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)  # NWIS downloads carry +00:00; keep their wall-clock days
+    recorded = dates.notna()
+    days = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+    if not recorded.any():
         print("DataFrame is empty after processing, no gaps to find.")
         return []
+    first_day, last_day = days[recorded].min(), days[recorded].max()
+    if values is not None:
+        recorded &= pd.notna(np.asarray(values))
 
-    # 2. Create a continuous daily date range covering the entire period
-    min_date = df.index.min()
-    max_date = df.index.max()
-    full_daily_index = pd.date_range(start=min_date, end=max_date, freq='D')
-
-    # 3. Reindex the DataFrame to this full daily range.
-    # This will introduce NaN values for any missing days.
-    # We only need one column to check for NaNs. If there are no data columns,
-    # we infer gaps directly from the missing index entries.
-    if df.shape[1] == 0:
-        # If DataFrame only has an index, missing dates are those in full_daily_index not in df.index
-        missing_dates_in_index = full_daily_index.difference(df.index)
-        is_missing_series = pd.Series(True, index=missing_dates_in_index)
-        # Combine with False for existing dates to make it a continuous boolean series
-        existing_dates_series = pd.Series(False, index=df.index)
-        boolean_mask = pd.concat([is_missing_series, existing_dates_series]).sort_index()
-        missing_days_indices = boolean_mask[boolean_mask].index  # Get only the dates where it's True (missing)
-    else:
-        # Reindex and check for NaNs in the first data column
-        df_reindexed = df.reindex(full_daily_index)
-        # Identify where the first data column is NaN
-        is_missing_series = df_reindexed.iloc[:, 0].isna()
-        missing_days_indices = is_missing_series[
-            is_missing_series].index  # Get only the dates where it's True (missing)
-
-    # 4. Group consecutive missing days and calculate their duration
-    gap_list = []
-    current_gap_start = None
-
-    # Iterate through the index of the identified missing days
-    for i, date in enumerate(missing_days_indices):
-        if current_gap_start is None:
-            current_gap_start = date
-
-        # Determine the next expected day if the gap were to continue
-        next_expected_day = date + pd.Timedelta(days=1)
-
-        # Check if the current gap is ending:
-        # - It's the last missing day in the list, OR
-        # - The next day in the `missing_days_indices` list is not the `next_expected_day`
-        if (i + 1 == len(missing_days_indices)) or (missing_days_indices[i + 1] != next_expected_day):
-            current_gap_end = date
-            duration_days = (current_gap_end - current_gap_start).days + 1  # +1 to include both start and end day
-
-            # 5. Filter by minimum gap duration
-            if duration_days > min_gap_duration_days:
-                gap_list.append({
-                    'start': current_gap_start.strftime('%Y-%m-%d'),
-                    'end': current_gap_end.strftime('%Y-%m-%d'),
-                    'duration_days': duration_days
-                })
-            current_gap_start = None  # Reset for the next potential gap
+    # 3. Missing days are those in the continuous daily range that were never recorded
+    missing = np.setdiff1d(np.arange(first_day, last_day + 1), days[recorded])
+    if not missing.size:
+        return []
+
+    # 4. Group consecutive missing days into runs and calculate their duration
+    breaks = np.flatnonzero(np.diff(missing) != 1)
+    starts = missing[np.r_[0, breaks + 1]]
+    ends = missing[np.r_[breaks, missing.size - 1]]
+    durations = ends - starts + 1  # +1 to include both start and end day
+
+    # 5. Filter by minimum gap duration
+    keep = durations > min_gap_duration_days
+    start_strs = np.datetime_as_string(starts[keep].astype('datetime64[D]'))
+    end_strs = np.datetime_as_string(ends[keep].astype('datetime64[D]'))
+    gap_list = [
+        {'start': str(start), 'end': str(end), 'duration_days': int(duration)}
+        for start, end, duration in zip(start_strs, end_strs, durations[keep])
+    ]
 
     return gap_list
 
 
+def report_gaps(gaps):
+    """Print a gap list, one gap per line."""
+    if not gaps:
+        print("No significant gaps detected")
+    for gap in gaps:
+        print(gap)
+
+
 if __name__ == '__main__':
+    warnings.simplefilter(action='ignore', category=FutureWarning)  # script runs only, not on import
 
     if LOOP_MODE:
         all_files = os.listdir(OUTPUT_PATH)
         for file_name in all_files:
             gaps = gap_track(OUTPUT_PATH, file_name)
             print(f"\n{file_name}")
-            if not gaps:
-                print("No significant gaps detected")
-            for gap in gaps:
-                print(gap)
+            report_gaps(gaps)
 
     else:
         gaps = gap_track(OUTPUT_PATH, SITE_FILE)
         print(f"\n{SITE_FILE}")
-        if not gaps:
-            print("No significant gaps detected")
-        for gap in gaps:
-            print(gap)
+        report_gaps(gaps)
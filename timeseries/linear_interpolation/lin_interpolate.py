@@ -1,9 +1,9 @@
 import os
 
-import matplotlib.pyplot as plt
 import pandas as pd
 
 
+COMPRESS = False  # write .csv.zst
 LOOP_MODE = False
 
 INPUT_FOLDER = 'ts_raw'
@@ -12,14 +12,23 @@ OUTPUT_FOLDER = 'ts_lin'
 CSV_PATH = os.path.join(INPUT_FOLDER, '41S_08900.csv')
 CSV_OUTPUT = os.path.join(OUTPUT_FOLDER, '41S_08900.csv')
 
+GAP_LEN_SP = 7
+GAP_LEN_OT = 22
+
 
 import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 
 
 def linear_interpolate(filepath, sp_gap, ot_gap, plot=True):
-    df = pd.read_csv(filepath, index_col=0, parse_dates=True)
+    if filepath.endswith('.parquet'):  # FMT='parquet' output of fill_dates
+        df = pd.read_parquet(filepath)
+    else:
+        df = pd.read_csv(filepath, index_col=0, parse_dates=True)
 
     # Ensure daily frequency
     df = df.asfreq("D")
@@ -30,6 +39,7 @@ def linear_interpolate(filepath, sp_gap, ot_gap, plot=True):
     if not is_nan.any():
         print(f"No gaps found in {os.path.basename(filepath)}")
         if plot:
+            import matplotlib.pyplot as plt  # only loaded when a figure is drawn
             plt.figure(figsize=(12, 5))
             plt.plot(df.index, df['q'], color='blue', label='Original (no gaps)')
             plt.title(os.path.basename(filepath))
@@ -40,43 +50,50 @@ def linear_interpolate(filepath, sp_gap, ot_gap, plot=True):
             plt.show()
         return df
 
-    # Find consecutive NaN blocks
-    gap_id = (is_nan != is_nan.shift()).cumsum()
-    gaps = df[is_nan].groupby(gap_id).apply(lambda g: g.index)
+    # Find consecutive NaN blocks: padding the mask with False makes every block start on a
+    # 0 -> 1 step and end (exclusive) on a 1 -> 0 step
+    edges = np.flatnonzero(np.diff(np.r_[False, is_nan.to_numpy(), False].astype(np.int8)))
+    gap_starts, gap_ends = edges[::2], edges[1::2]
+    gap_lens = gap_ends - gap_starts
+
+    # Define season by the month each gap starts in
+    start_months = df.index.month.to_numpy()[gap_starts]
+    in_spring = (start_months >= 3) & (start_months <= 7)
+    accepted = gap_lens <= np.where(in_spring, sp_gap, ot_gap)
+
+    for start, end, gap_len, spring, ok in zip(gap_starts, gap_ends, gap_lens, in_spring, accepted):
+        start_date = df.index[start]
+        end_date = df.index[end - 1]
+        if ok:
+            print(f"Interpolated gap {start_date.date()} → {end_date.date()} "
+                  f"({gap_len} days, {'spring' if spring else 'other'})")
+        else:
+            print(f"Skipped gap {start_date.date()} → {end_date.date()} "
+                  f"({gap_len} days, too long for {'spring' if spring else 'other'})")
+
+    # Mark the days of the accepted gaps (+1 where one starts, -1 where it ends, running sum)
+    steps = np.zeros(len(df) + 1, dtype=np.int64)
+    np.add.at(steps, gap_starts[accepted], 1)
+    np.add.at(steps, gap_ends[accepted], -1)
+    interpolated = np.cumsum(steps[:-1]) > 0
 
     # Work on a copy
     df_out = df.copy()
 
-    # Collect interpolated indices
-    interpolated_idx = []
-
-    for _, gap_dates in gaps.items():
-        gap_len = len(gap_dates)
-        start_date = gap_dates[0]
-        end_date = gap_dates[-1]
-
-        # Define season
-        in_spring = (start_date.month >= 3) and (start_date.month <= 7)
-        rule_gap = sp_gap if in_spring else ot_gap
-
-        if gap_len <= rule_gap:
-            # Interpolate just this gap
-            df_out['q'] = df_out['q'].interpolate(method='linear', limit_area='inside')
-            interpolated_idx.extend(gap_dates)
-
-            print(f"Interpolated gap {start_date.date()} → {end_date.date()} "
-                  f"({gap_len} days, {'spring' if in_spring else 'other'})")
-        else:
-            print(f"Skipped gap {start_date.date()} → {end_date.date()} "
-                  f"({gap_len} days, too long for {'spring' if in_spring else 'other'})")
+    # Interpolate the series once and copy the result into the accepted gaps only, so skipped
+    # gaps stay NaN
+    if interpolated.any():
+        filled = df['q'].interpolate(method='linear', limit_area='inside')
+        df_out.loc[interpolated, 'q'] = filled[interpolated]
 
     # Plot
     if plot:
+        import matplotlib.pyplot as plt  # only loaded when a figure is drawn
         plt.figure(figsize=(12, 5))
         plt.plot(df.index, df['q'], color='blue', label='Original')
-        if interpolated_idx:
-            plt.scatter(df_out.loc[interpolated_idx].index,
-                        df_out.loc[interpolated_idx, 'q'],
+        if interpolated.any():
+            plt.scatter(df_out.index[interpolated],
+                        df_out.loc[interpolated, 'q'],
                         color='red', label='Interpolated', zorder=5)
         plt.title(os.path.basename(filepath))
         plt.xlabel("Date")
@@ -88,20 +105,24 @@ def linear_interpolate(filepath, sp_gap, ot_gap, plot=True):
     return df_out
 
 
-if __name__ == '__main__':
+def _one_file(file_name):
+    """Interpolate a single file from INPUT_FOLDER into OUTPUT_FOLDER without plotting (process-pool worker)."""
+    print(f"\n{file_name}")
+    filepath = os.path.join(INPUT_FOLDER, file_name)
+    df_intr = linear_interpolate(filepath, GAP_LEN_SP, GAP_LEN_OT, plot=False)
+    out_name = Path(file_name.removesuffix('.zst')).stem + ('.csv.zst' if COMPRESS else '.csv')
+    df_intr.to_csv(os.path.join(OUTPUT_FOLDER, out_name))
 
-    gap_len_sp = 7
-    gap_len_ot = 22
+
+if __name__ == '__main__':
 
     if LOOP_MODE:
         all_files = os.listdir(INPUT_FOLDER)
-        for file_name in all_files:
-            print(f"\n{file_name}")
-            filepath = os.path.join(INPUT_FOLDER, file_name)
-            df_intr = linear_interpolate(os.path.join(filepath), gap_len_sp, gap_len_ot, plot=False)
-            df_intr.to_csv(os.path.join(OUTPUT_FOLDER, file_name))
+        # Files are independent, so spread them across all cores
+        with ProcessPoolExecutor() as ex:
+            list(ex.map(_one_file, all_files, chunksize=1))
 
     else:
         print(f"\n{CSV_PATH}")
-        df_intr = linear_interpolate(CSV_PATH, gap_len_sp, gap_len_ot)
+        df_intr = linear_interpolate(CSV_PATH, GAP_LEN_SP, GAP_LEN_OT)
         df_intr.to_csv(CSV_OUTPUT)
\ No newline at end of file
@@ -1,4 +1,4 @@
-import os
+from pathlib import Path
 
 import pandas as pd
 
@@ -13,16 +13,18 @@ def join_dataframe(q_file, p_file):
     except FileNotFoundError:
         print(f"Error: The file '{q_file} or {p_file}' was not found.")
 
-    p_df = p_df.reindex(q_df.index)
-    merged_df = pd.merge(q_df, p_df, left_index=True, right_index=True, how='inner')
+    # Left join keeps every q day and aligns PRISM values by date in one pass (NaN where PRISM has
+    # no value), which is what reindexing p_df to q_df and then inner-merging produced
+    merged_df = q_df.join(p_df, how='left', lsuffix='_x', rsuffix='_y')
 
     return merged_df
 
 
 if __name__ == '__main__':
 
+    directory = Path(DIRECTORY)
     for file_name in SITE_LIST:
-        q_series = os.path.join(DIRECTORY, file_name)
-        prism_series = os.path.join(DIRECTORY, f'{file_name.split('.')[0]}_prism.csv')
+        q_series = directory / file_name
+        prism_series = directory / f'{q_series.stem}_prism.csv'
         df_merged = join_dataframe(q_series, prism_series)
-        df_merged.to_csv(os.path.join('ts', f'{file_name.split('.')[0]}_joined.csv'))
+        df_merged.to_csv(Path('ts', f'{q_series.stem}_joined.csv'))
@@ -1,8 +1,10 @@
-import miceforest as mf
+import numpy as np
 import pandas as pd
 import os
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
+COMPRESS = False  # write .csv.zst
 LOOP_MODE = False
 
 CSV_PATH = 'timeseries_continuous/12335100.csv'
@@ -12,27 +14,54 @@ INPUT_FOLDER = 'timeseries_continuous'
 OUTPUT_FOLDER = 'timeseries_interpolated'
 
 
-def miceforest_fill(file_path):
+def miceforest_fill(file_path, plot=True):
     try:
-        ts_df = pd.read_csv(file_path, index_col=0, parse_dates=True, encoding='utf-8')
+        if file_path.endswith('.parquet'):  # FMT='parquet' output of fill_dates
+            ts_df = pd.read_parquet(file_path)
+        else:
+            ts_df = pd.read_csv(file_path, index_col=0, parse_dates=True, encoding='utf-8')
     except FileNotFoundError:
         print(f"Error: The file '{file_path}' was not found.")
 
-    ts_df['dayofyear'] = ts_df.index.dayofyear
-    ts_df['month'] = ts_df.index.month
-    ts_df['q_lag1'] = ts_df['q'].shift(1)  # looks at prior day q
-    ts_df['q_lag2'] = ts_df['q'].shift(2)  # looks at q 2 days ago
-    ts_df['q_lead1'] = ts_df['q'].shift(-1)  # looks at next day q
-    ts_df['q_lead2'] = ts_df['q'].shift(-2)  # looks at q 2 days from now
+    # Build every feature column at once: row i of the NaN-padded 5-day window is q[i-2 .. i+2], so
+    # its columns are the lags and leads; small int dtypes for the calendar features
+    q = ts_df['q'].to_numpy(dtype=float)
+    window = np.lib.stride_tricks.sliding_window_view(np.concatenate(([np.nan] * 2, q, [np.nan] * 2)), 5)
+    features = pd.DataFrame({
+        'dayofyear': ts_df.index.dayofyear.to_numpy().astype(np.int16),
+        'month': ts_df.index.month.to_numpy().astype(np.int8),
+        'q_lag1': window[:, 1],  # looks at prior day q
+        'q_lag2': window[:, 0],  # looks at q 2 days ago
+        'q_lead1': window[:, 3],  # looks at next day q
+        'q_lead2': window[:, 4],  # looks at q 2 days from now
+    }, index=ts_df.index)
+    ts_df = pd.concat([ts_df, features], axis=1)
     # ts_df['q_rolling_mean_7d'] = ts_df['q'].rolling(window=7, min_periods=1).mean()
     # ts_df['q_rolling_std_7d'] = ts_df['q'].rolling(window=7, min_periods=1).std()
+    # flows carry ~5-6 significant digits and LightGBM bins its inputs as float32 anyway, so halve
+    # the memory of the flow columns (q and its lags/leads) the kernel copies around; any other
+    # float column keeps full precision
+    flow_cols = [col for col in ts_df.select_dtypes('float64').columns if col == 'q' or col.startswith('q_')]
+    ts_df[flow_cols] = ts_df[flow_cols].astype('float32')
+
+    # Nothing to impute (common once lin_interpolate has closed the short gaps): skip the MICE run
+    if not ts_df['q'].isna().any():
+        print(f"No gaps found in {os.path.basename(file_path)}")
+        return ts_df
+
+    # miceforest pulls in LightGBM/scipy, so it is only imported once there is something to impute
+    import miceforest as mf
 
     # need to store the datetime index, reset, then reload datetime index after
     og_df_index = ts_df.index
     ts_df_mice = ts_df.reset_index(drop=True)
 
+    # Only q is written back out, and complete_data() returns dataset 0, so impute q alone in a
+    # single dataset; the calendar/lag/lead features are just predictors (LightGBM handles their NaNs)
     kernel = mf.ImputationKernel(data=ts_df_mice,
-                                 num_datasets=5,
+                                 num_datasets=1,
+                                 variable_schema={'q': ['dayofyear', 'month', 'q_lag1', 'q_lag2',
+                                                        'q_lead1', 'q_lead2']},
                                  random_state=42
                                  )
 
@@ -52,23 +81,25 @@ def miceforest_fill(file_path):
     # df_imputed_mice = df_imputed_mice.drop(columns=['dayofyear', 'month'])
 
     # Visualize Results
-    plt.figure(figsize=(18, 8))
-    plt.plot(ts_df.index, ts_df['q'], 'o-', markersize=4, label='Original Data (with gaps)',
-             alpha=0.7)
-    plt.plot(df_imputed_mice.index, df_imputed_mice['q'], 'r-', label='Imputed Data', alpha=0.8)
+    if plot:
+        import matplotlib.pyplot as plt  # batch workers never plot, so they never load it
+        plt.figure(figsize=(18, 8))
+        plt.plot(ts_df.index, ts_df['q'], 'o-', markersize=4, label='Original Data (with gaps)',
+                 alpha=0.7)
+        plt.plot(df_imputed_mice.index, df_imputed_mice['q'], 'r-', label='Imputed Data', alpha=0.8)
 
-    # Highlight the imputed points specifically
-    imputed_points = df_imputed_mice[ts_df['q'].isna()]
-    plt.scatter(imputed_points.index, imputed_points['q'], color='green', marker='X', s=100, zorder=5,
-                label='Imputed Points')
+        # Highlight the imputed points specifically
+        imputed_points = df_imputed_mice[ts_df['q'].isna()]
+        plt.scatter(imputed_points.index, imputed_points['q'], color='green', marker='X', s=100, zorder=5,
+                    label='Imputed Points')
 
-    plt.title('Discharge Time Series: Original vs. Imputed Data Gaps')
-    plt.xlabel('Date')
-    plt.ylabel('Discharge (cfs)')
-    plt.grid(True)
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
+        plt.title('Discharge Time Series: Original vs. Imputed Data Gaps')
+        plt.xlabel('Date')
+        plt.ylabel('Discharge (cfs)')
+        plt.grid(True)
+        plt.legend()
+        plt.tight_layout()
+        plt.show()
 
 
 
@@ -76,14 +107,23 @@ def miceforest_fill(file_path):
 
     return df_imputed_mice
 
+
+def _one_file(file_name):
+    """Impute a single file from INPUT_FOLDER into OUTPUT_FOLDER without plotting (process-pool worker)."""
+    df_fill = miceforest_fill(os.path.join(INPUT_FOLDER, file_name), plot=False)
+    print(f"\n{file_name}")
+    out_name = Path(file_name.removesuffix('.zst')).stem + ('.csv.zst' if COMPRESS else '.csv')
+    df_fill.to_csv(os.path.join(OUTPUT_FOLDER, out_name))
+
+
 if __name__ == '__main__':
 
     if LOOP_MODE:
         all_files = os.listdir(INPUT_FOLDER)
-        for file_name in all_files:
-            df_fill = miceforest_fill(os.path.join(INPUT_FOLDER, file_name))
-            print(f"\n{file_name}")
-            df_fill.to_csv(os.path.join(OUTPUT_FOLDER, file_name))
+        # Each file's MICE run is independent, so spread the files across all cores; plotting is
+        # off in batch mode so no worker blocks on plt.show()
+        with ProcessPoolExecutor() as ex:
+            list(ex.map(_one_file, all_files, chunksize=1))
 
     else:
         df_fill = miceforest_fill(CSV_PATH)
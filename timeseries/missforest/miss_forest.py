@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 
 import pandas as pd
 
@@ -18,7 +19,10 @@ OUTPUT_FOLDER = 'ts_interpolated'
 def missforest_fill(file_path):
 
     try:
-        ts_df = pd.read_csv(file_path, index_col=0, parse_dates=True, encoding='utf-8')
+        if file_path.endswith('.parquet'):  # FMT='parquet' output of fill_dates
+            ts_df = pd.read_parquet(file_path)
+        else:
+            ts_df = pd.read_csv(file_path, index_col=0, parse_dates=True, encoding='utf-8')
     except FileNotFoundError:
         print(f"Error: The file '{file_path}' was not found.")
 
@@ -44,7 +48,14 @@ def missforest_fill(file_path):
     # print(ts_df.isna().sum())
     # print("\nAre there any columns with non-NaN values?", any(ts_df.count() > 0))
 
-    ts_df = ts_df.set_index('datetime')
+    if 'datetime' in ts_df.columns:  # CSVs written with a row-number index; Parquet is already date-indexed
+        ts_df = ts_df.set_index('datetime')
+
+    # Nothing to impute: skip the MissForest fit
+    if not ts_df.isna().any().any():
+        print(f"No gaps found in {os.path.basename(file_path)}")
+        return ts_df
+
     categorical_cols = []
     imputer = MissForest(categorical=categorical_cols)
     df_imputed = imputer.fit_transform(ts_df)
@@ -82,7 +93,7 @@ if __name__ == '__main__':
         for file_name in all_files:
             df_fill = missforest_fill(os.path.join(INPUT_FOLDER, file_name))
             print(f"\n{file_name}")
-            df_fill.to_csv(os.path.join(OUTPUT_FOLDER, file_name))
+            df_fill.to_csv(os.path.join(OUTPUT_FOLDER, Path(file_name).stem + '.csv'))
 
     else:
         df_fill = missforest_fill(CSV_PATH)
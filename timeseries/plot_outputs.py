@@ -8,7 +8,6 @@ Config settings:
 """
 
 import os
-from datetime import datetime
 import numpy as np
 
 import matplotlib.dates as mdates
@@ -28,11 +27,12 @@ def plot(path, file):
     file_path = os.path.join(path, file)
     ts_df = pd.read_csv(file_path)
 
-    x_data = ts_df.iloc[:, 0].to_numpy()
+    # Vectorized parse (repeated strings are parsed once); NWIS stamps are UTC, kept as naive times
+    dates = ts_df.iloc[:, 0]
     try:
-        x_data = [datetime.strptime(x, '%Y-%m-%d %H:%M:%S+00:00') for x in x_data]
+        x_data = pd.to_datetime(dates, format='%Y-%m-%d %H:%M:%S+00:00', cache=True).to_numpy()
     except ValueError:
-        x_data = [datetime.strptime(x, '%Y-%m-%d') for x in x_data]
+        x_data = pd.to_datetime(dates, format='%Y-%m-%d', cache=True).to_numpy()
 
     y_data = ts_df.iloc[:, 1].to_numpy()
 
@@ -1,5 +1,6 @@
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
 LOOP_MODE = True
@@ -32,10 +33,8 @@ station_list = [
 ]
 
 if LOOP_MODE:
-    for file_name in station_list:
-        source = os.path.join(OUTPUT_FOLDER, f'{file_name}.csv')
-        destination = os.path.join(TRANSFER_FOLDER, f'{file_name}.csv')
-        shutil.copy(source, destination)
-
-
-
+    sources = [os.path.join(OUTPUT_FOLDER, f'{file_name}.csv') for file_name in station_list]
+    destinations = [os.path.join(TRANSFER_FOLDER, f'{file_name}.csv') for file_name in station_list]
+    # copies are I/O-bound, so overlap them on threads; list() surfaces any copy error
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        list(ex.map(shutil.copy, sources, destinations))